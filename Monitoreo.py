@@ -1,10 +1,53 @@
 import tkinter as tk
 from tkinter import messagebox
-import cv2
 import time
-from PIL import Image, ImageTk
-from face_detection_module import FaceDetectionModule
-from event_monitor import EventMonitor
+import socket
+from exam_summary import build_summary
+from frame_scheduler import AdaptiveScheduler
+from startup import StartupLoader
+from stats_panel import StatsPanel
+
+#Módulos pesados (cv2, numpy, PIL, pynput): se importan en segundo plano
+#mientras la ventana ya se muestra (ver _import_heavy_modules).
+EventMonitor = None
+FramePipeline = None
+PerfMonitor = None
+PreviewDisplay = None
+SessionEngine = None
+
+
+def _import_heavy_modules():
+    global EventMonitor, FramePipeline, PerfMonitor, PreviewDisplay, SessionEngine
+    from event_monitor import EventMonitor as _EventMonitor
+    from frame_pipeline import FramePipeline as _FramePipeline
+    from perf_monitor import PerfMonitor as _PerfMonitor
+    from preview_display import PreviewDisplay as _PreviewDisplay
+    from session_engine import SessionEngine as _SessionEngine
+
+    EventMonitor = _EventMonitor
+    FramePipeline = _FramePipeline
+    PerfMonitor = _PerfMonitor
+    PreviewDisplay = _PreviewDisplay
+    SessionEngine = _SessionEngine
+
+
+def _new_face_detector(options):
+    #Importa cv2 y carga el cascade (lo más lento del arranque)
+    from face_detection_module import FaceDetectionModule
+    return FaceDetectionModule(**(options or {}))
+
+
+def _open_source(source=0, realtime=True):
+    #source: índice de cámara, ruta/patrón (ver frame_sources.open_source) o FrameSource
+    from frame_sources import FrameSource, open_source
+    if isinstance(source, FrameSource):
+        cap = source
+    else:
+        cap = open_source(source, realtime=realtime)
+    if not cap.isOpened():
+        cap.release()
+        raise RuntimeError("No se pudo abrir la cámara.")
+    return cap
 
 
 class ProctoringApp:
@@ -12,37 +55,90 @@ class ProctoringApp:
     Aplicación principal:
     - Muestra la cámara.
     - Botón para iniciar/detener el "examen".
-    - Integra:
+    - Integra, a través de SessionEngine (session_engine):
         * FaceDetectionModule (giros de cabeza).
         * EventMonitor (cambios de ventana por mouse/teclado).
+      El motor lleva los tiempos; la app es solo un frente Tk sobre él
+      (monitor_daemon es el frente sin interfaz).
+    Con threaded=True la captura, la detección y la conversión de imagen
+    corren en hilos separados (FramePipeline) y el loop de Tk solo muestra
+    el último resultado terminado.
+    Con perf=True registra duraciones por etapa (PerfMonitor); show_perf las
+    muestra junto a las estadísticas y perf_dump_path las guarda al cerrar.
+    Con timeline_path graba una línea de tiempo binaria por frame durante el
+    examen (timeline_log); "{start}" en la ruta se reemplaza por la hora de inicio.
+    La vista previa (PreviewDisplay) reutiliza buffers y un único PhotoImage;
+    preview_scale la reduce y preview_fps limita su frecuencia aparte del análisis.
+    Con schedule_options (p. ej. {"cpu_budget": 0.5, "target_fps": 15}) el
+    intervalo de análisis lo ajusta un AdaptiveScheduler según el costo medido.
+    El panel de estadísticas (StatsPanel) se refresca stats_fps veces por
+    segundo, aparte de la cámara, y solo toca los labels cuyo texto cambió.
+    Con stats_server ("host:puerto") un StatsClient envía en segundo plano
+    los incrementos de los totales al servicio del aula (stats_service),
+    identificado por student_id (por defecto, el nombre del equipo).
+    Con reuse_buffers=True la captura, el espejo y la imagen de detección
+    escriben en buffers preasignados por resolución (frame_buffers) en vez
+    de asignar arreglos nuevos en cada frame; en modo hilos el anillo de
+    captura supone el ritmo de una cámara en vivo (con fuentes más rápidas
+    usar drop_policy="block").
+    source elige la fuente de frames (frame_sources): índice de cámara (por
+    defecto 0), video, secuencia de imágenes, "synthetic:N" o un FrameSource.
+    Los tiempos salen de los timestamps de la fuente, así una grabación da
+    los mismos resultados a ritmo real (realtime=True) o a máxima velocidad
+    (realtime=False; con threaded=True usar drop_policy="block" para no
+    descartar frames).
+    Arranque: la ventana se muestra de inmediato; los módulos pesados, el
+    cascade y la cámara se cargan en paralelo en segundo plano (StartupLoader)
+    y al mostrar el primer frame se imprime el desglose de tiempos.
     """
 
-    def __init__(self, window, window_title="Monitoreo de Examen"):
+    def __init__(self, window, window_title="Monitoreo de Examen",
+                 threaded=True, queue_size=2, drop_policy="oldest",
+                 detector_options=None, perf=False, show_perf=False,
+                 perf_dump_path=None, timeline_path=None,
+                 preview_scale=1.0, preview_fps=None, schedule_options=None,
+                 stats_fps=4.0, stats_server=None, student_id=None, reuse_buffers=False,
+                 source=0, realtime=True):
         self.window = window
         self.window.title(window_title)
 
-        #-----------Cámara-----------
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
-            raise RuntimeError("No se pudo abrir la cámara.")
-
-        #-----------Módulos-----------
-        self.face_detector = FaceDetectionModule()
-        self.event_monitor = EventMonitor()
-
-        #------Estado del examen------
-        self.is_exam_running = False
-        self.exam_start_time = None
-        self.last_frame_time = None
-
-        #Tiempos globales
-        self.total_exam_time = 0.0
-        self.attention_time = 0.0
-        self.no_attention_time = 0.0
-
-        #Tiempos por cambios de pantalla
-        self.mouse_window_time = 0.0
-        self.keyboard_window_time = 0.0
+        #-----------Arranque en segundo plano-----------
+        self.startup = StartupLoader()
+        self.startup.run("modules", _import_heavy_modules)
+        #detector_options: p. ej. {"tracking": True, "redetect_interval": 10}
+        if reuse_buffers:
+            detector_options = dict(detector_options or {}, reuse_buffers=True)
+        self.startup.run("detector", lambda: _new_face_detector(detector_options))
+        self.startup.run("camera", lambda: _open_source(source, realtime))
+        self._options = {
+            "threaded": threaded,
+            "queue_size": queue_size,
+            "drop_policy": drop_policy,
+            "perf": perf or show_perf or perf_dump_path,
+            "preview_scale": preview_scale,
+            "preview_fps": preview_fps,
+            "reuse_buffers": reuse_buffers,
+        }
+        self._ready = False
+
+        #Se completan en _finish_startup
+        self.cap = None
+        self.face_detector = None
+        self.event_monitor = None
+        self.engine = None
+        self.display = None
+        self.perf = None
+        self.perf_dump_path = perf_dump_path
+        self.stats_client = None
+        self._stats_server = stats_server
+        self._student_id = student_id
+
+        #-----------Planificador-----------
+        #None = intervalo fijo de 20 ms como siempre
+        self.scheduler = AdaptiveScheduler(**schedule_options) if schedule_options is not None else None
+
+        #Línea de tiempo por frame (opcional, la graba el motor)
+        self.timeline_path = timeline_path
 
         #-------Interfaz Gráfica-------
         # Frame superior para el botón
@@ -54,11 +150,12 @@ class ProctoringApp:
             text="Iniciar Examen",
             command=self.toggle_exam_state,
             width=40,
+            state=tk.DISABLED,  #se habilita cuando la cámara está lista
         )
         self.btn_toggle.pack(side="top", padx=5, pady=5)
 
         #Label de video al centro
-        self.video_label = tk.Label(self.window)
+        self.video_label = tk.Label(self.window, text="Iniciando cámara...", width=80, height=20)
         self.video_label.pack(padx=5, pady=5)
 
         # Stats abajo, en dos columnas (izquierda/derecha)
@@ -82,47 +179,159 @@ class ProctoringApp:
             anchor="nw",
         )
         self.stats_label_right.pack(side=tk.LEFT, padx=3, pady=5, expand=True, fill=tk.BOTH)
+
+        #Solo se escribe en los labels de stats a través del panel (caché de textos)
+        self.stats_panel = StatsPanel(
+            {"left": self.stats_label_left, "right": self.stats_label_right},
+            max_fps=stats_fps,
+        )
+        self._stats_job = None
+
+        #Overlay de rendimiento (opcional)
+        self.perf_label = None
+        if show_perf:
+            self.perf_label = tk.Label(
+                bottom_frame,
+                text="",
+                font=("Courier", 9),
+                justify="left",
+                anchor="nw",
+            )
+            self.perf_label.pack(side=tk.LEFT, padx=3, pady=5, expand=True, fill=tk.BOTH)
     
         #Cerrar
         self.window.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        #Esperar a que termine el arranque en segundo plano
+        self.pipeline = None
+        self._shown_version = 0
+        self.window.after_idle(lambda: self.startup.mark("window"))
+        self._poll_startup()
+
+    #--------Arranque----------
+
+    def _poll_startup(self):
+        if not self.startup.done():
+            self.window.after(15, self._poll_startup)
+            return
+        self._finish_startup()
+
+    def _finish_startup(self):
+        """Completa la inicialización en el hilo de Tk cuando todo cargó."""
+        errors = self.startup.errors
+        if errors:
+            error = errors.get("camera") or next(iter(errors.values()))
+            self.video_label.config(text=str(error))
+            messagebox.showerror("Monitoreo de Examen", str(error))
+            return
+
+        opts = self._options
+        self.cap = self.startup.results["camera"]
+
+        #-----------Instrumentación-----------
+        self.perf = PerfMonitor() if opts["perf"] else None
+
+        #-----------Módulos-----------
+        self.face_detector = self.startup.results["detector"]
+        self.face_detector.perf = self.perf
+        self.event_monitor = EventMonitor()
+
+        self.video_label.config(text="", width=0, height=0)
+        self.display = PreviewDisplay(
+            self.video_label, scale=opts["preview_scale"], max_fps=opts["preview_fps"]
+        )
+
+        #-----------Motor de la sesión-----------
+        buffer_slots = None
+        if opts["reuse_buffers"] and opts["threaded"]:
+            #En modo hilos: frames en cola + el que se procesa + el que se captura
+            buffer_slots = opts["queue_size"] + 3
+        self.engine = SessionEngine(
+            self.cap,
+            self.face_detector,
+            self.event_monitor,
+            perf=self.perf,
+            scheduler=self.scheduler,
+            timeline_path=self.timeline_path,
+            reuse_buffers=opts["reuse_buffers"],
+            #En modo hilos lee el pipeline (con su propio anillo)
+            capture_slots=0 if opts["threaded"] else 1,
+            #El pipeline copia cada frame publicado (copy_latest): un solo buffer de espejo
+            mirror_slots=1,
+        )
+
+        #-----------Pipeline-----------
+        if opts["threaded"]:
+            self.pipeline = FramePipeline(
+                self.cap,
+                self.engine.analyze_frame,
+                queue_size=opts["queue_size"],
+                drop_policy=opts["drop_policy"],
+                perf=self.perf,
+                render_fn=None,  #la conversión la hace PreviewDisplay en el hilo de Tk
+                scheduler=self.scheduler,
+                buffer_slots=buffer_slots,
+                #El espejo reutiliza su buffer: Tk muestra una copia que no se reescribe
+                copy_latest=opts["reuse_buffers"],
+            )
+            self.pipeline.start()
+
+        #-----------Servicio del aula (opcional)-----------
+        if self._stats_server:
+            from stats_client import StatsClient
+            host, port = self._stats_server.rsplit(":", 1)
+            self.stats_client = StatsClient(
+                host,
+                int(port),
+                self._student_id or socket.gethostname(),
+                self.get_results,
+                running_fn=lambda: self.is_exam_running,
+            )
+            self.stats_client.start()
+
+        self._ready = True
+        self.btn_toggle.config(state=tk.NORMAL)
+
         #Arrancar loop de video
         self.update_frame()
+        if self.perf_label is not None:
+            self.refresh_perf_overlay()
+
+    def _mark_first_frame(self):
+        if "first_frame" not in self.startup.marks:
+            self.startup.mark("first_frame")
+            print("[Startup] Tiempo hasta el primer frame:\n" + self.startup.report())
 
     #--------Control del examen----------
 
-    def reset_global_stats(self):
-        self.total_exam_time = 0.0
-        self.attention_time = 0.0
-        self.no_attention_time = 0.0
-        self.mouse_window_time = 0.0
-        self.keyboard_window_time = 0.0
+    @property
+    def is_exam_running(self):
+        return self.engine is not None and self.engine.is_exam_running
 
     def toggle_exam_state(self):
         if not self.is_exam_running:
             #INICIAR
-            self.is_exam_running = True
-            self.exam_start_time = time.time()
-            self.last_frame_time = self.exam_start_time
-
-            self.face_detector.reset_stats()
-            self.event_monitor.reset_stats()
-            self.reset_global_stats()
-
-            #La ventana actual será la "ventana de examen"
-            self.event_monitor.start_monitoring()
+            self.engine.start_exam()
 
             self.btn_toggle.config(
                 text="Detener Examen y Mostrar Resultados",
                 bg="red",
                 fg="white",
             )
-            self.stats_label_left.config(text="Examen en curso...")
-            self.stats_label_right.config(text="")
+            self.stats_panel.show(left="Examen en curso...", right="")
+            self._stats_job = self.window.after(self.stats_panel.interval_ms, self.refresh_statistics)
         else:
             #DETENER
-            self.is_exam_running = False
-            self.event_monitor.stop_monitoring()
+            self.engine.stop_exam()
+            if self._stats_job is not None:
+                self.window.after_cancel(self._stats_job)
+                self._stats_job = None
+            if self.scheduler is not None:
+                sched = self.scheduler.get_stats()
+                print(
+                    f"[Scheduler] FPS logrados: {sched['achieved_fps']:.1f} "
+                    f"(costo medio {sched['avg_cost_ms']:.1f} ms)"
+                )
             self.btn_toggle.config(
                 text="Iniciar Examen",
                 bg=self.window.cget("bg"),
@@ -133,149 +342,142 @@ class ProctoringApp:
     #-----------Bucle de video------------
 
     def update_frame(self):
-        ret, frame = self.cap.read()
+        if self.pipeline is not None:
+            self._show_latest_frame()
+            #Solo refresca la imagen; la captura no bloquea el loop de Tk
+            self.window.after(10, self.update_frame)
+            return
+
+        perf = self.perf
+        ret, frame = self.engine.read()
+        frame_start = time.perf_counter()
         if not ret:
-            self.stats_label_left.config(text="No se pudo leer de la cámara.")
-            self.stats_label_right.config(text="")
+            self.stats_panel.show(left=self._read_error_text(), right="")
         else:
-            frame = cv2.flip(frame, 1)  # espejo
-
-            #Calculamos dt
-            now = time.time()
-            if self.last_frame_time is None:
-                dt = 0.0
-            else:
-                dt = now - self.last_frame_time
-            self.last_frame_time = now
-
-            #Procesamiento solo si el examen corre
-            if self.is_exam_running and dt > 0:
-                on_exam_window, cause = self.event_monitor.check_window()
-
-                if not on_exam_window:
-                    #Tiempo de no atención por cambio de pantalla
-                    self.total_exam_time += dt
-                    self.no_attention_time += dt
-
-                    if cause == "mouse":
-                        self.mouse_window_time += dt
-                    elif cause == "keyboard":
-                        self.keyboard_window_time += dt
-
-                    #No procesamos cabeza para no mezclar causas
-                    processed_frame = frame
-                    is_attentive = False
-                else:
-                    processed_frame, head_attentive, _ = self.face_detector.process_frame(
-                        frame, dt
-                    )
-
-                    self.total_exam_time += dt
-                    if head_attentive:
-                        self.attention_time += dt
-                        is_attentive = True
-                    else:
-                        self.no_attention_time += dt
-                        is_attentive = False
-
-                #Actualizar texto de estadísticas en vivo
-                self.update_statistics_display()
-            else:
-                #Examen parado: solo mostramos cámara sin contar tiempos
-                processed_frame, _, _ = self.face_detector.process_frame(frame, 0.0)
-
-            #Convertir para Tkinter
-            processed_frame = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(processed_frame)
-            self.photo = ImageTk.PhotoImage(image=img)
-            self.video_label.config(image=self.photo)
+            processed_frame = self.engine.analyze_frame(frame, self.cap.last_timestamp)
+
+            #Mostrar en Tkinter (respetando el límite de FPS de la vista previa)
+            if perf:
+                t0 = perf.clock()
+            if self.display.show(processed_frame):
+                if perf:
+                    perf.lap("tk_image", t0)
+                self._mark_first_frame()
+            if perf:
+                perf.frame()
 
         #Re-programar llamada
-        self.window.after(20, self.update_frame)
+        delay_ms = 20
+        if self.scheduler is not None and ret:
+            delay = self.scheduler.next_delay(time.perf_counter() - frame_start)
+            delay_ms = max(1, int(delay * 1000))
+        self.window.after(delay_ms, self.update_frame)
+
+    def _show_latest_frame(self):
+        """Muestra el último frame terminado por el pipeline (si hay uno nuevo)."""
+        if self.pipeline.read_failed:
+            self.stats_panel.show(left=self._read_error_text(), right="")
+            return
+
+        if not self.display.due():
+            return
+        version, processed_frame = self.pipeline.latest()
+        if processed_frame is None or version == self._shown_version:
+            return
+        self._shown_version = version
+
+        perf = self.perf
+        if perf:
+            t0 = perf.clock()
+        self.display.show(processed_frame)
+        if perf:
+            perf.lap("tk_image", t0)
+        self._mark_first_frame()
+
+    def _read_error_text(self):
+        if self.cap.live:
+            return "No se pudo leer de la cámara."
+        return "Fin de la grabación."
+
+    def refresh_statistics(self):
+        """Refresca las estadísticas en vivo a la frecuencia del panel mientras corre el examen."""
+        self.update_statistics_display()
+        self._stats_job = self.window.after(self.stats_panel.interval_ms, self.refresh_statistics)
+
+    def refresh_perf_overlay(self):
+        """Refresca el overlay de rendimiento (~2 veces por segundo)."""
+        text = self.perf.format_overlay()
+        if self.scheduler is not None:
+            sched = self.scheduler.get_stats()
+            text += f"\nAnálisis: {sched['achieved_fps']:5.1f} FPS (obj. {sched['scheduled_fps']:5.1f})"
+        self.perf_label.config(text=text)
+        self.window.after(500, self.refresh_perf_overlay)
 
     def update_statistics_display(self):
-        if self.total_exam_time <= 0:
-            self.stats_label_left.config(text="Recopilando datos...")
-            self.stats_label_right.config(text="")
+        results = self.engine.get_results()
+        total = results["total_exam_time"]
+        if total <= 0:
+            self.stats_panel.show(left="Recopilando datos...", right="")
             return
 
-        att_pct = (self.attention_time / self.total_exam_time) * 100.0
-        non_att_pct = (self.no_attention_time / self.total_exam_time) * 100.0
+        att_pct = (results["attention_time"] / total) * 100.0
+        non_att_pct = (results["no_attention_time"] / total) * 100.0
 
-        fd_stats = self.face_detector.get_stats()
-        em_stats = self.event_monitor.get_stats()
+        fd_stats = results["face_stats"]
+        em_stats = results["event_stats"]
 
         left_text = (
-            f"Duracion: {self.total_exam_time:5.1f} s\n"
-            f"Atencion: {self.attention_time:5.1f} s ({att_pct:4.1f}%)\n"
-            f"No atencion: {self.no_attention_time:5.1f} s ({non_att_pct:4.1f}%)\n\n"
+            f"Duracion: {total:5.1f} s\n"
+            f"Atencion: {results['attention_time']:5.1f} s ({att_pct:4.1f}%)\n"
+            f"No atencion: {results['no_attention_time']:5.1f} s ({non_att_pct:4.1f}%)\n\n"
             f"Giros izquierda: {fd_stats['left']:4.1f} s\n"
             f"Giros derecha:  {fd_stats['right']:4.1f} s\n"
             f"Giros arriba:   {fd_stats['up']:4.1f} s\n"
             f"Giros abajo:    {fd_stats['down']:4.1f} s\n\n"
         )
         right_text = (
-            f"Tiempo fuera por mouse:    {self.mouse_window_time:4.1f} s\n"
-            f"Tiempo fuera por teclado:  {self.keyboard_window_time:4.1f} s\n"
+            f"Tiempo fuera por mouse:    {results['mouse_window_time']:4.1f} s\n"
+            f"Tiempo fuera por teclado:  {results['keyboard_window_time']:4.1f} s\n"
             f"Cambios ventana mouse:     {em_stats['mouse_changes']}\n"
             f"Cambios ventana teclado:   {em_stats['keyboard_changes']}"
         )
-        self.stats_label_left.config(text=left_text)
-        self.stats_label_right.config(text=right_text)
+        self.stats_panel.show(left=left_text, right=right_text)
 
     #-------------Resultados finales---------------
 
+    def get_results(self):
+        """Totales de la sesión en el formato de exam_summary.build_summary."""
+        return self.engine.get_results()
+
     def show_results(self):
-        if self.total_exam_time <= 0:
+        summary_text = build_summary(self.get_results())
+        if summary_text is None:
             messagebox.showinfo(
                 "Resultados del Examen",
                 "No se registraron datos suficientes.",
             )
             return
 
-        att_pct = (self.attention_time / self.total_exam_time) * 100.0
-        non_att_pct = (self.no_attention_time / self.total_exam_time) * 100.0
-
-        fd_stats = self.face_detector.get_stats()
-        em_stats = self.event_monitor.get_stats()
-
-        summary = []
-        summary.append("--- RESUMEN DEL EXAMEN ---")
-        summary.append(f"Duracion Total: {self.total_exam_time:4.1f}s")
-        summary.append(f"Tiempo de Atencion: {self.attention_time:4.1f}s")
-        summary.append(f"Tiempo de No Atencion: {self.no_attention_time:4.1f}s")
-        summary.append("")
-        summary.append("--- CAUSAS DE NO ATENCION (GIROS) ---")
-        summary.append(f"Giros Izquierda: {fd_stats['left']:4.1f}s")
-        summary.append(f"Giros Derecha:   {fd_stats['right']:4.1f}s")
-        summary.append(f"Giros Arriba:    {fd_stats['up']:4.1f}s")
-        summary.append(f"Giros Abajo:     {fd_stats['down']:4.1f}s")
-        summary.append("")
-        summary.append("--- CAMBIOS DE PANTALLA ---")
-        summary.append(f"Cambios Mouse (ventana):   {em_stats['mouse_changes']} veces")
-        summary.append(f"Cambios Teclado (ventana): {em_stats['keyboard_changes']} veces")
-        summary.append(
-            f"Tiempo fuera por Mouse:    {self.mouse_window_time:4.1f}s"
-        )
-        summary.append(
-            f"Tiempo fuera por Teclado:  {self.keyboard_window_time:4.1f}s"
-        )
-        summary.append("")
-        summary.append("--- EVALUACION ---")
-        summary.append(f"Porcentaje de No Atencion: {non_att_pct:4.1f}%")
-        sospechoso = "SI" if non_att_pct > 40.0 else "NO"
-        summary.append(f"Comportamiento Sospechoso (>40%): {sospechoso}")
-
-        summary_text = "\n".join(summary)
         messagebox.showinfo("Resultados del Examen", summary_text)
 
     #-------------Limpieza-------------
 
     def on_close(self):
-        if self.is_exam_running:
-            self.event_monitor.stop_monitoring()
-        if self.cap.isOpened():
-            self.cap.release()
+        if not self._ready:
+            #Cierre durante el arranque: la cámara puede abrirse igual en segundo plano
+            cap = self.startup.results.get("camera")
+            if cap is not None:
+                cap.release()
+            self.window.destroy()
+            return
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        if self.stats_client is not None:
+            self.stats_client.stop()
+        #Detiene el examen (monitor de eventos, línea de tiempo) y libera la cámara
+        self.engine.close()
+        if self.perf is not None and self.perf_dump_path:
+            self.perf.dump(self.perf_dump_path)
         self.window.destroy()
 
 
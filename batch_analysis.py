@@ -0,0 +1,178 @@
+"""
+Análisis offline de exámenes grabados.
+
+Recorre un directorio de videos, corre FaceDetectionModule sobre cada uno
+usando los timestamps del propio video como dt, y escribe por archivo el
+mismo resumen que muestra ProctoringApp.show_results.
+Los archivos se reparten en un pool de procesos (uno por núcleo).
+
+Uso:
+    python batch_analysis.py grabaciones/ --output-dir resultados/
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from exam_summary import build_summary
+from face_detection_module import FaceDetectionModule
+from frame_sources import VideoFileSource
+from session_engine import SessionEngine
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".webm")
+
+
+def analyze_video(path, detector_options=None, flip=True, batch_size=1):
+    """
+    Analiza un video grabado con el mismo SessionEngine que la app en vivo
+    (sin monitor de ventanas: todo el tiempo cuenta para la cabeza).
+    - flip: aplica el mismo espejo que la app en vivo (las direcciones
+      izquierda/derecha dependen de ello).
+    - batch_size: con > 1 se bufferean segmentos de frames y se detectan
+      con SessionEngine.analyze_frames (una llamada al backend por
+      segmento; sin tracking ni compuerta de movimiento).
+    Devuelve el dict de resultados (formato de exam_summary.build_summary)
+    más el nombre del archivo, frames procesados y tiempo de cómputo.
+    """
+    source = VideoFileSource(path)
+    detector = FaceDetectionModule(**(detector_options or {}))
+    engine = SessionEngine(source, detector, mirror=flip)
+    start = time.perf_counter()
+
+    try:
+        engine.start_exam()
+        if batch_size > 1:
+            frames, timestamps = [], []
+            while True:
+                ret, frame = source.read()
+                if ret:
+                    frames.append(frame)
+                    timestamps.append(source.last_timestamp)
+                if frames and (not ret or len(frames) >= batch_size):
+                    engine.analyze_frames(frames, timestamps)
+                    frames, timestamps = [], []
+                if not ret:
+                    break
+        else:
+            while engine.step()[0]:
+                pass
+        results = engine.stop_exam()
+    finally:
+        engine.close()
+
+    return {
+        "file": os.path.basename(path),
+        "frames": engine.frames_analyzed,
+        "elapsed": time.perf_counter() - start,
+        **results,
+        "gate_stats": detector.get_gate_stats(),
+    }
+
+
+def _init_worker():
+    #Un proceso por núcleo: evitamos que OpenCV abra sus propios hilos
+    cv2.setNumThreads(1)
+
+
+def _analyze_to_file(path, output_dir, detector_options, flip, batch_size):
+    results = analyze_video(path, detector_options, flip, batch_size)
+    name = os.path.splitext(results["file"])[0]
+
+    summary_text = build_summary(results) or "No se registraron datos suficientes."
+    with open(os.path.join(output_dir, name + ".txt"), "w", encoding="utf-8") as f:
+        f.write(summary_text + "\n")
+    with open(os.path.join(output_dir, name + ".json"), "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return results
+
+
+def find_videos(directory):
+    paths = [
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith(VIDEO_EXTENSIONS)
+    ]
+    #Los más grandes primero para balancear mejor el pool
+    return sorted(paths, key=os.path.getsize, reverse=True)
+
+
+def run_batch(directory, output_dir, workers=None, detector_options=None, flip=True,
+              batch_size=1):
+    """Procesa todos los videos de `directory`; devuelve la lista de resultados."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = find_videos(directory)
+    all_results = []
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=_init_worker) as pool:
+        futures = {
+            pool.submit(_analyze_to_file, path, output_dir, detector_options, flip, batch_size): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                results = future.result()
+            except Exception as exc:
+                print(f"[batch] ERROR {os.path.basename(path)}: {exc}")
+                continue
+            speed = results["total_exam_time"] / results["elapsed"] if results["elapsed"] > 0 else 0.0
+            print(
+                f"[batch] {results['file']}: {results['frames']} frames, "
+                f"{results['total_exam_time']:.1f}s de video en {results['elapsed']:.1f}s "
+                f"({speed:.1f}x tiempo real)"
+            )
+            all_results.append(results)
+
+    return all_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análisis offline de exámenes grabados.")
+    parser.add_argument("directory", help="Directorio con los videos")
+    parser.add_argument("--output-dir", default="resultados", help="Directorio de salida")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--tracking", action="store_true", help="Activa el modo tracking por ROI")
+    parser.add_argument("--detection-width", default=None,
+                        help="Ancho de detección en px o preset (precision/balanced/fast)")
+    parser.add_argument("--no-flip", action="store_true", help="No aplicar espejo a los frames")
+    parser.add_argument("--backend", default="haar", choices=["haar", "lbp", "dnn"],
+                        help="Backend de detección")
+    parser.add_argument("--model", default=None,
+                        help="XML del cascade (haar/lbp) o modelo de cv2.dnn")
+    parser.add_argument("--motion-threshold", type=float, default=None,
+                        help="Reutiliza la última detección si el frame cambió menos que esto (niveles de gris)")
+    parser.add_argument("--model-config", default=None, help="Config del modelo dnn (p. ej. deploy.prototxt)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Frames por llamada de detección (> 1: sin tracking ni compuerta de movimiento)")
+    args = parser.parse_args()
+    if args.batch_size > 1 and (args.tracking or args.motion_threshold is not None):
+        parser.error("--batch-size > 1 no admite --tracking ni --motion-threshold")
+
+    detection_width = args.detection_width
+    if detection_width is not None and detection_width.isdigit():
+        detection_width = int(detection_width)
+    backend_options = {}
+    if args.backend == "dnn":
+        backend_options = {"model_path": args.model, "config_path": args.model_config}
+    elif args.model:
+        backend_options = {"filename": args.model}
+    detector_options = {
+        "tracking": args.tracking,
+        "detection_width": detection_width,
+        "backend": args.backend,
+        "backend_options": backend_options,
+        "motion_threshold": args.motion_threshold,
+    }
+
+    start = time.perf_counter()
+    results = run_batch(args.directory, args.output_dir, args.workers,
+                        detector_options, flip=not args.no_flip, batch_size=args.batch_size)
+    print(f"[batch] {len(results)} videos en {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
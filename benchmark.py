@@ -0,0 +1,362 @@
+"""
+Benchmark reproducible del camino caliente por frame (sin cámara ni pantalla).
+
+Mide por etapa: FaceDetectionModule.process_frame, cv2.flip, la conversión
+BGR->RGB + PIL + ImageTk.PhotoImage de update_frame, y
+EventMonitor.check_window. Usa frames generados a varias resoluciones y
+cantidades de rostros (opcionalmente a partir de una imagen con un rostro).
+
+Con --soak N corre en cambio una sesión larga de N frames del camino de
+análisis (captura, espejo, detección), con y sin buffers reutilizables, y
+reporta latencia (p50/p99/máx), pausas del GC y evolución de la memoria.
+
+Uso:
+    python benchmark.py --output bench.json
+    python benchmark.py --image rostro.png --baseline bench.json
+    python benchmark.py --soak 20000 --resolutions 720p
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from face_detection_module import FaceDetectionModule
+from frame_buffers import BufferRing, read_into
+
+RESOLUTIONS = {
+    "480p": (480, 640),
+    "720p": (720, 1280),
+    "1080p": (1080, 1920),
+}
+FACE_COUNTS = (0, 1, 2)
+
+
+def _draw_face(size):
+    """Rostro esquemático para cuando no se da una imagen real."""
+    face = np.full((size, size, 3), 60, dtype=np.uint8)
+    c = size // 2
+    cv2.ellipse(face, (c, c), (int(size * 0.38), int(size * 0.48)), 0, 0, 360, (170, 190, 220), -1)
+    for ex in (int(size * 0.35), int(size * 0.65)):
+        cv2.circle(face, (ex, int(size * 0.4)), max(2, size // 14), (40, 40, 40), -1)
+    cv2.ellipse(face, (c, int(size * 0.7)), (size // 6, size // 16), 0, 0, 180, (60, 60, 140), 2)
+    return face
+
+
+def make_frames(resolution, n_faces, n_frames, face_image=None, seed=0):
+    """Genera una secuencia de frames BGR con `n_faces` rostros que se mueven."""
+    h, w = RESOLUTIONS[resolution]
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 80, size=(h, w, 3), dtype=np.uint8)
+    size = h // 3
+    if face_image is not None:
+        face = cv2.resize(face_image, (size, size))
+    else:
+        face = _draw_face(size)
+
+    frames = []
+    for i in range(n_frames):
+        frame = background.copy()
+        for k in range(n_faces):
+            x0 = int((w - size) * (k + 1) / (n_faces + 1))
+            x = int(np.clip(x0 + 20 * np.sin(i / 10.0 + k), 0, w - size))
+            y = (h - size) // 2
+            frame[y:y + size, x:x + size] = face
+        frames.append(frame)
+    return frames
+
+
+def _summary(samples):
+    arr = np.asarray(samples) * 1000.0  #ms
+    mean = float(arr.mean())
+    return {
+        "mean_ms": mean,
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p90_ms": float(np.percentile(arr, 90)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "fps": 1000.0 / mean if mean > 0 else 0.0,
+    }
+
+
+def _make_photo_fn():
+    """Devuelve una función que crea un ImageTk.PhotoImage, o None sin display."""
+    try:
+        import tkinter as tk
+        from PIL import ImageTk
+        root = tk.Tk()
+        root.withdraw()
+    except Exception:
+        return None
+    return lambda img: ImageTk.PhotoImage(image=img)
+
+
+def _make_event_monitor():
+    """EventMonitor con una ventana de examen ficticia, o None si no hay pynput."""
+    try:
+        from event_monitor import EventMonitor
+    except Exception:
+        return None
+    monitor = EventMonitor()
+    monitor.exam_window_title = "Monitoreo de Examen"
+    return monitor
+
+
+def run_case(frames, detector_options, photo_fn, event_monitor):
+    """Corre una combinación resolución/rostros; devuelve stats por etapa."""
+    detector = FaceDetectionModule(**(detector_options or {}))
+    timings = {"flip": [], "process_frame": [], "to_rgb_pil": [], "photo_image": [], "check_window": []}
+    dt = 1.0 / 30.0
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for frame in frames:
+        t0 = time.perf_counter()
+        mirrored = cv2.flip(frame, 1)
+        t1 = time.perf_counter()
+        processed, _, _ = detector.process_frame(mirrored, dt)
+        t2 = time.perf_counter()
+        img = Image.fromarray(cv2.cvtColor(processed, cv2.COLOR_BGR2RGB))
+        t3 = time.perf_counter()
+        timings["flip"].append(t1 - t0)
+        timings["process_frame"].append(t2 - t1)
+        timings["to_rgb_pil"].append(t3 - t2)
+
+        if photo_fn is not None:
+            photo_fn(img)
+            timings["photo_image"].append(time.perf_counter() - t3)
+        if event_monitor is not None:
+            t4 = time.perf_counter()
+            event_monitor.check_window()
+            timings["check_window"].append(time.perf_counter() - t4)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stages = {name: _summary(samples) for name, samples in timings.items() if samples}
+    return {
+        "frames": len(frames),
+        "fps": len(frames) / elapsed if elapsed > 0 else 0.0,
+        "peak_mem_mb": peak / (1024 * 1024),
+        "stages": stages,
+    }
+
+
+def run_benchmark(resolutions, face_counts, n_frames, face_image=None, detector_options=None):
+    cv2.setNumThreads(1)  #resultados comparables entre máquinas
+    photo_fn = _make_photo_fn()
+    event_monitor = _make_event_monitor()
+
+    cases = {}
+    for resolution in resolutions:
+        for n_faces in face_counts:
+            frames = make_frames(resolution, n_faces, n_frames, face_image)
+            key = f"{resolution}/{n_faces}faces"
+            cases[key] = run_case(frames, detector_options, photo_fn, event_monitor)
+            print(f"[bench] {key}: {cases[key]['fps']:.1f} fps, "
+                  f"process_frame p50 {cases[key]['stages']['process_frame']['p50_ms']:.2f} ms",
+                  file=sys.stderr)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "frames_per_case": n_frames,
+            "detector_options": detector_options or {},
+        },
+        "cases": cases,
+    }
+
+
+class _LoopCapture:
+    """Cámara simulada: devuelve los frames en bucle, copiándolos como cap.read()."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = 0
+
+    def read(self, image=None):
+        src = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        if image is None or image.shape != src.shape:
+            return True, src.copy()
+        np.copyto(image, src)
+        return True, image
+
+
+def _rss_mb():
+    """Memoria residente actual (MB) o None si /proc no está disponible."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def run_soak(frames, n_frames, detector_options=None, reuse_buffers=False, samples=20):
+    """
+    Sesión larga del camino de análisis de update_frame: lectura de cámara,
+    espejo y process_frame. Devuelve latencias, pausas del GC y memoria.
+    """
+    options = dict(detector_options or {}, reuse_buffers=reuse_buffers)
+    detector = FaceDetectionModule(**options)
+    cap = _LoopCapture(frames)
+    capture_ring = BufferRing() if reuse_buffers else None
+    mirror_ring = BufferRing() if reuse_buffers else None
+    shape = None
+    dt = 1.0 / 30.0
+
+    gc_pauses = []
+    gc_start = [0.0]
+
+    def on_gc(phase, info):
+        if phase == "start":
+            gc_start[0] = time.perf_counter()
+        else:
+            gc_pauses.append(time.perf_counter() - gc_start[0])
+
+    times = np.empty(n_frames)
+    rss = []
+    every = max(1, n_frames // samples)
+    gc.collect()
+    gc.callbacks.append(on_gc)
+    try:
+        for i in range(n_frames):
+            t0 = time.perf_counter()
+            if capture_ring is not None:
+                _, frame = read_into(cap, capture_ring, shape)
+                shape = frame.shape
+            else:
+                _, frame = cap.read()
+            mirror = mirror_ring.next(frame.shape) if mirror_ring is not None else None
+            mirrored = cv2.flip(frame, 1, dst=mirror)
+            detector.process_frame(mirrored, dt)
+            times[i] = time.perf_counter() - t0
+            if i % every == 0:
+                rss.append(_rss_mb())
+    finally:
+        gc.callbacks.remove(on_gc)
+
+    result = _summary(times)
+    result["max_ms"] = float(times.max() * 1000.0)
+    result["gc_collections"] = len(gc_pauses)
+    result["gc_pause_ms"] = float(sum(gc_pauses) * 1000.0)
+    if rss and rss[0] is not None:
+        result["rss_start_mb"] = rss[0]
+        result["rss_end_mb"] = rss[-1]
+        result["rss_growth_mb"] = rss[-1] - rss[0]
+    return result
+
+
+def compare(current, baseline, tolerance=0.15):
+    """
+    Compara p50 por etapa contra un baseline.
+    Devuelve la lista de regresiones (más lento que baseline * (1 + tolerance)).
+    """
+    regressions = []
+    for key, case in current["cases"].items():
+        base_case = baseline.get("cases", {}).get(key)
+        if base_case is None:
+            continue
+        for stage, stats in case["stages"].items():
+            base_stats = base_case["stages"].get(stage)
+            if base_stats is None or base_stats["p50_ms"] <= 0:
+                continue
+            ratio = stats["p50_ms"] / base_stats["p50_ms"]
+            if ratio > 1.0 + tolerance:
+                regressions.append({
+                    "case": key,
+                    "stage": stage,
+                    "baseline_p50_ms": base_stats["p50_ms"],
+                    "p50_ms": stats["p50_ms"],
+                    "ratio": ratio,
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del procesamiento por frame.")
+    parser.add_argument("--resolutions", nargs="*", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--faces", nargs="*", type=int, default=list(FACE_COUNTS))
+    parser.add_argument("--frames", type=int, default=100, help="Frames por caso")
+    parser.add_argument("--image", default=None, help="Imagen de un rostro para generar los frames")
+    parser.add_argument("--tracking", action="store_true", help="Activa el modo tracking por ROI")
+    parser.add_argument("--detection-width", default=None,
+                        help="Ancho de detección en px o preset (precision/balanced/fast)")
+    parser.add_argument("--backend", default="haar", choices=["haar", "lbp", "dnn"], help="Backend de detección")
+    parser.add_argument("--model", default=None, help="XML del cascade (haar/lbp) o modelo de cv2.dnn")
+    parser.add_argument("--motion-threshold", type=float, default=None,
+                        help="Reutiliza la última detección si el frame cambió menos que esto (niveles de gris)")
+    parser.add_argument("--model-config", default=None, help="Config del modelo dnn")
+    parser.add_argument("--soak", type=int, default=0,
+                        help="Frames de la sesión larga (con y sin buffers reutilizables)")
+    parser.add_argument("--output", default=None, help="Archivo JSON de salida (por defecto stdout)")
+    parser.add_argument("--baseline", default=None, help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Tolerancia de regresión (0.15 = 15%)")
+    args = parser.parse_args()
+
+    face_image = cv2.imread(args.image) if args.image else None
+    detection_width = args.detection_width
+    if detection_width is not None and detection_width.isdigit():
+        detection_width = int(detection_width)
+    backend_options = {}
+    if args.backend == "dnn":
+        backend_options = {"model_path": args.model, "config_path": args.model_config}
+    elif args.model:
+        backend_options = {"filename": args.model}
+    detector_options = {
+        "tracking": args.tracking,
+        "detection_width": detection_width,
+        "backend": args.backend,
+        "backend_options": backend_options,
+        "motion_threshold": args.motion_threshold,
+    }
+
+    if args.soak:
+        cv2.setNumThreads(1)
+        resolution = args.resolutions[0]
+        frames = make_frames(resolution, 1, 60, face_image)
+        results = {"meta": {"resolution": resolution, "frames": args.soak,
+                            "detector_options": detector_options}}
+        for mode, reuse in (("alloc", False), ("reuse_buffers", True)):
+            results[mode] = run_soak(frames, args.soak, detector_options, reuse)
+            print(f"[soak] {mode}: p50 {results[mode]['p50_ms']:.2f} ms, "
+                  f"p99 {results[mode]['p99_ms']:.2f} ms, máx {results[mode]['max_ms']:.2f} ms, "
+                  f"GC {results[mode]['gc_collections']}, "
+                  f"RSS +{results[mode].get('rss_growth_mb', 0.0):.1f} MB", file=sys.stderr)
+        print(json.dumps(results, indent=2))
+        return
+
+    results = run_benchmark(args.resolutions, args.faces, args.frames, face_image, detector_options)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        results["regressions"] = compare(results, baseline, args.tolerance)
+        for reg in results["regressions"]:
+            print(f"[bench] REGRESION {reg['case']} {reg['stage']}: "
+                  f"{reg['baseline_p50_ms']:.2f} -> {reg['p50_ms']:.2f} ms (x{reg['ratio']:.2f})",
+                  file=sys.stderr)
+        if results["regressions"]:
+            exit_code = 1
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Reporte de cohorte: muchas sesiones de un mismo período de exámenes.
+
+Carga los resultados por sesión (los .json de batch_analysis o cualquier
+dict con el formato de ProctoringApp.get_results) en un arreglo columnar
+(sesiones x campos) y calcula de forma vectorizada:
+- distribución y percentiles de duración y % de no atención;
+- desglose de la no atención por causa: giros de cabeza, cambios de
+  ventana por mouse / teclado y el resto (rostro perdido, causa desconocida);
+- sesiones atípicas respecto de la cohorte (z robusto con mediana/MAD) y
+  sospechosas por el umbral fijo de exam_summary.
+
+La carga se cachea en un .npz: al repetir el reporte solo se vuelven a leer
+los archivos nuevos o modificados, y dentro del proceso cada cálculo se
+hace una sola vez.
+
+Uso:
+    python cohort_report.py resultados/ --cache cohorte.npz
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from exam_summary import SUSPICIOUS_PCT
+from stats_service import FIELDS, FIELD_INDEX, flatten_results
+
+PERCENTILES = (5, 25, 50, 75, 95)
+#Causas de no atención (columnas derivadas, en segundos)
+CAUSES = ("head_turns", "window_mouse", "window_keyboard", "other")
+#Umbral de z robusto para marcar atípicos (Iglewicz-Hoaglin)
+OUTLIER_Z = 3.5
+
+
+def find_results(paths):
+    """Expande directorios a sus .json; devuelve las rutas ordenadas."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(os.path.join(path, name) for name in os.listdir(path)
+                         if name.endswith(".json"))
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load_row(path):
+    with open(path, encoding="utf-8") as f:
+        return flatten_results(json.load(f))
+
+
+def load_sessions(paths, cache_path=None):
+    """
+    Carga las sesiones en una Cohort.
+    - cache_path: .npz con filas ya leídas; se reutilizan las de archivos
+      sin cambios (misma fecha de modificación y tamaño) y se actualiza.
+      Si no termina en .npz se le agrega (np.savez lo haría igual).
+    """
+    paths = find_results(paths)
+    if cache_path and not cache_path.endswith(".npz"):
+        cache_path += ".npz"
+    cached = {}
+    if cache_path and os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as npz:
+            if tuple(npz["fields"]) == FIELDS:
+                for path, mtime, size, row in zip(npz["paths"], npz["mtimes"], npz["sizes"], npz["data"]):
+                    cached[str(path)] = ((int(mtime), int(size)), row)
+
+    data = np.empty((len(paths), len(FIELDS)))
+    mtimes = np.empty(len(paths), dtype=np.int64)
+    sizes = np.empty(len(paths), dtype=np.int64)
+    loaded = 0
+    for i, path in enumerate(paths):
+        fingerprint = _fingerprint(path)
+        hit = cached.get(path)
+        if hit is not None and hit[0] == fingerprint:
+            data[i] = hit[1]
+        else:
+            data[i] = _load_row(path)
+            loaded += 1
+        mtimes[i], sizes[i] = fingerprint
+
+    if cache_path and (loaded or len(cached) != len(paths)):
+        np.savez(cache_path, paths=np.array(paths, dtype=str), mtimes=mtimes, sizes=sizes,
+                 data=data, fields=np.array(FIELDS))
+
+    names = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    return Cohort(names, data, loaded=loaded)
+
+
+class Cohort:
+    """
+    Sesiones en columnas: data[sesión, campo] con los campos de
+    stats_service.FIELDS. Las métricas derivadas se calculan una vez y se
+    guardan (las consultas repetidas no recalculan).
+    """
+
+    def __init__(self, names, data, loaded=0, suspicious_pct=SUSPICIOUS_PCT):
+        self.names = np.asarray(names)
+        self.data = np.asarray(data, dtype=np.float64)
+        self.loaded = loaded
+        self.suspicious_pct = suspicious_pct
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.data)
+
+    def column(self, name):
+        return self.data[:, FIELD_INDEX[name]]
+
+    def _cached(self, key, fn):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    #-----------Métricas por sesión-----------
+
+    def non_attention_pct(self):
+        def compute():
+            total = self.column("total_exam_time")
+            safe = np.where(total > 0, total, 1.0)
+            return np.where(total > 0, self.column("no_attention_time") / safe * 100.0, 0.0)
+        return self._cached("non_attention_pct", compute)
+
+    def causes(self):
+        """Segundos de no atención por causa: arreglo (S, len(CAUSES))."""
+        def compute():
+            turns = self.data[:, [FIELD_INDEX[k] for k in ("left", "right", "up", "down")]].sum(axis=1)
+            mouse = self.column("mouse_window_time")
+            keyboard = self.column("keyboard_window_time")
+            other = np.maximum(self.column("no_attention_time") - turns - mouse - keyboard, 0.0)
+            return np.stack([turns, mouse, keyboard, other], axis=1)
+        return self._cached("causes", compute)
+
+    def cause_shares(self):
+        """Fracción de la no atención de cada sesión que aporta cada causa."""
+        def compute():
+            causes = self.causes()
+            total = causes.sum(axis=1, keepdims=True)
+            return np.divide(causes, total, out=np.zeros_like(causes), where=total > 0)
+        return self._cached("cause_shares", compute)
+
+    def robust_z(self):
+        """
+        z robusto de (% no atención, aporte de cada causa) respecto de la
+        cohorte: 0.6745 * (x - mediana) / MAD. Arreglo (S, 1 + len(CAUSES)).
+        """
+        def compute():
+            values = np.column_stack([self.non_attention_pct(), self.cause_shares() * 100.0])
+            median = np.median(values, axis=0)
+            mad = np.median(np.abs(values - median), axis=0)
+            safe = np.where(mad > 0, mad, 1.0)
+            return np.where(mad > 0, 0.6745 * (values - median) / safe, 0.0)
+        return self._cached("robust_z", compute)
+
+    def outliers(self, threshold=OUTLIER_Z):
+        """Máscara de sesiones atípicas hacia arriba en alguna de las métricas."""
+        return self._cached(("outliers", threshold), lambda: (self.robust_z() > threshold).any(axis=1))
+
+    def suspicious(self):
+        return self._cached("suspicious", lambda: self.non_attention_pct() > self.suspicious_pct)
+
+    #-----------Resumen de la cohorte-----------
+
+    def percentiles(self, q=PERCENTILES):
+        """Percentiles de duración, % de no atención y segundos por causa."""
+        def compute():
+            values = np.column_stack([
+                self.column("total_exam_time"),
+                self.non_attention_pct(),
+                self.causes(),
+            ])
+            table = np.percentile(values, q, axis=0) if len(values) else np.zeros((len(q), values.shape[1]))
+            names = ("total_exam_time", "non_attention_pct") + CAUSES
+            return {name: dict(zip(q, table[:, i].tolist())) for i, name in enumerate(names)}
+        return self._cached(("percentiles", tuple(q)), compute)
+
+    def distribution(self, bins=20):
+        """Histograma del % de no atención en `bins` tramos de 0 a 100."""
+        def compute():
+            counts, edges = np.histogram(self.non_attention_pct(), bins=bins, range=(0.0, 100.0))
+            return counts.tolist(), edges.tolist()
+        return self._cached(("distribution", bins), compute)
+
+    def cause_breakdown(self):
+        """Totales de la cohorte por causa (segundos y % de la no atención)."""
+        def compute():
+            totals = self.causes().sum(axis=0)
+            overall = totals.sum()
+            return {
+                cause: {
+                    "seconds": float(totals[i]),
+                    "pct": float(totals[i] / overall * 100.0) if overall > 0 else 0.0,
+                    "sessions": int((self.causes()[:, i] > 0).sum()),
+                }
+                for i, cause in enumerate(CAUSES)
+            }
+        return self._cached("cause_breakdown", compute)
+
+    def flagged(self, limit=None):
+        """Sesiones atípicas o sospechosas, de mayor a menor % de no atención."""
+        mask = self.outliers() | self.suspicious()
+        idx = np.flatnonzero(mask)
+        idx = idx[np.argsort(-self.non_attention_pct()[idx], kind="stable")]
+        if limit is not None:
+            idx = idx[:limit]
+        z = self.robust_z()
+        shares = self.cause_shares()
+        return [
+            {
+                "session": str(self.names[i]),
+                "non_attention_pct": float(self.non_attention_pct()[i]),
+                "suspicious": bool(self.suspicious()[i]),
+                "outlier": bool(self.outliers()[i]),
+                "max_z": float(z[i].max()),
+                "main_cause": CAUSES[int(shares[i].argmax())],
+            }
+            for i in idx
+        ]
+
+    def report(self, limit=20):
+        return {
+            "sessions": len(self),
+            "suspicious": int(self.suspicious().sum()),
+            "outliers": int(self.outliers().sum()),
+            "percentiles": self.percentiles(),
+            "distribution": self.distribution(),
+            "causes": self.cause_breakdown(),
+            "flagged": self.flagged(limit),
+        }
+
+
+def format_report(report):
+    lines = [f"--- COHORTE: {report['sessions']} sesiones ---"]
+    lines.append(f"Sospechosas (>{SUSPICIOUS_PCT:.0f}%): {report['suspicious']}   "
+                 f"Atípicas: {report['outliers']}")
+    lines.append("")
+    lines.append("Percentiles        " + "".join(f"{f'p{q}':>9}" for q in PERCENTILES))
+    for name, values in report["percentiles"].items():
+        lines.append(f"{name:<18} " + "".join(f"{values[q]:9.1f}" for q in PERCENTILES))
+    lines.append("")
+    lines.append("--- NO ATENCION POR CAUSA ---")
+    for cause, info in report["causes"].items():
+        lines.append(f"{cause:<16} {info['seconds']:10.1f}s {info['pct']:5.1f}%  "
+                     f"({info['sessions']} sesiones)")
+    lines.append("")
+    lines.append("--- DISTRIBUCION % NO ATENCION ---")
+    counts, edges = report["distribution"]
+    peak = max(counts) if counts and max(counts) > 0 else 1
+    for count, lo, hi in zip(counts, edges[:-1], edges[1:]):
+        lines.append(f"{lo:5.0f}-{hi:3.0f}% {count:6d} " + "#" * int(round(40 * count / peak)))
+    lines.append("")
+    lines.append("--- SESIONES MARCADAS ---")
+    for item in report["flagged"]:
+        marks = ("SOSPECHOSA " if item["suspicious"] else "") + ("ATIPICA" if item["outlier"] else "")
+        lines.append(f"{item['session']:<24} {item['non_attention_pct']:5.1f}%  "
+                     f"z={item['max_z']:5.1f}  causa: {item['main_cause']:<16} {marks}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reporte de una cohorte de sesiones.")
+    parser.add_argument("paths", nargs="+", help="Directorios o archivos .json de resultados")
+    parser.add_argument("--cache", default=None, help="Archivo .npz para cachear la carga")
+    parser.add_argument("--top", type=int, default=20, help="Sesiones marcadas a listar")
+    parser.add_argument("--json", default=None, help="Guarda el reporte en JSON")
+    args = parser.parse_args()
+
+    cohort = load_sessions(args.paths, args.cache)
+    if len(cohort) == 0:
+        print("No se encontraron resultados.")
+        return
+    print(f"[cohort] {len(cohort)} sesiones ({cohort.loaded} leídas, "
+          f"{len(cohort) - cohort.loaded} desde la caché)", file=sys.stderr)
+    report = cohort.report(args.top)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import functools
+import os
+
+import cv2
+import numpy as np
+
+DEFAULT_CASCADE = "haarcascade_frontalface_default.xml"
+DEFAULT_LBP_CASCADE = "lbpcascade_frontalface_improved.xml"
+
+
+@functools.lru_cache(maxsize=None)
+def load_cascade(filename=DEFAULT_CASCADE):
+    """
+    Carga (una sola vez por proceso) un cascade. `filename` puede ser una
+    ruta o un nombre dentro de cv2.data.haarcascades.
+    Las instancias de FaceDetectionModule del mismo proceso lo comparten.
+    """
+    path = filename if os.path.exists(filename) else cv2.data.haarcascades + filename
+    cascade = cv2.CascadeClassifier(path)
+    if cascade.empty():
+        raise RuntimeError(f"No se pudo cargar el cascade: {filename}")
+    return cascade
+
+
+def _no_faces():
+    return np.empty((0, 4), dtype=np.int32)
+
+
+class DetectorBackend:
+    """
+    Interfaz de detección de rostros usada por FaceDetectionModule.
+    - color: True si el backend necesita la imagen BGR (si no, recibe gris).
+    - detect(image, min_size, max_size): cajas (N, 4) x, y, w, h en
+      coordenadas de `image`.
+    - detect_batch(images, min_size): lista de cajas por imagen; los
+      backends que pueden procesar varias imágenes en una pasada la redefinen.
+    """
+
+    name = "base"
+    color = False
+
+    def detect(self, image, min_size=None, max_size=None):
+        raise NotImplementedError
+
+    def detect_batch(self, images, min_size=None):
+        return [self.detect(image, min_size) for image in images]
+
+
+class CascadeBackend(DetectorBackend):
+    """Cascade de OpenCV (Haar o LBP) sobre imagen en gris."""
+
+    def __init__(self, filename, scale_factor=1.1, min_neighbors=5):
+        self.cascade = load_cascade(filename)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def detect(self, image, min_size=None, max_size=None):
+        kwargs = {}
+        if min_size:
+            kwargs["minSize"] = (min_size, min_size)
+        if max_size:
+            kwargs["maxSize"] = (max_size, max_size)
+        faces = self.cascade.detectMultiScale(
+            image,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            flags=cv2.CASCADE_SCALE_IMAGE,
+            **kwargs,
+        )
+        return faces if len(faces) > 0 else _no_faces()
+
+
+class HaarBackend(CascadeBackend):
+    """Haar cascade frontal por defecto (el detector original)."""
+
+    name = "haar"
+
+    def __init__(self, filename=DEFAULT_CASCADE, **kwargs):
+        super().__init__(filename, **kwargs)
+
+
+class LBPBackend(CascadeBackend):
+    """
+    Cascade LBP de OpenCV: bastante más rápido que Haar y algo menos preciso.
+    Los wheels de pip no traen data/lbpcascades; `filename` puede apuntar al
+    XML (p. ej. lbpcascade_frontalface_improved.xml del repositorio de OpenCV).
+    """
+
+    name = "lbp"
+
+    def __init__(self, filename=DEFAULT_LBP_CASCADE, **kwargs):
+        super().__init__(filename, **kwargs)
+
+
+class DnnBackend(DetectorBackend):
+    """
+    Detector SSD de cv2.dnn cargado desde archivos locales (p. ej.
+    res10_300x300_ssd_iter_140000.caffemodel + deploy.prototxt).
+    detect_batch arma un único blob con todas las imágenes y hace un solo
+    forward.
+    """
+
+    name = "dnn"
+    color = True
+
+    def __init__(self, model_path, config_path=None, input_size=(300, 300),
+                 mean=(104.0, 177.0, 123.0), confidence=0.5):
+        if not os.path.exists(model_path):
+            raise RuntimeError(f"No se encontró el modelo: {model_path}")
+        self.net = cv2.dnn.readNet(model_path, config_path or "")
+        self.input_size = input_size
+        self.mean = mean
+        self.confidence = confidence
+
+    def _boxes(self, detections, index, width, height, min_size):
+        rows = detections[(detections[:, 0] == index) & (detections[:, 2] >= self.confidence)]
+        if len(rows) == 0:
+            return _no_faces()
+        x1 = np.clip(rows[:, 3] * width, 0, width)
+        y1 = np.clip(rows[:, 4] * height, 0, height)
+        x2 = np.clip(rows[:, 5] * width, 0, width)
+        y2 = np.clip(rows[:, 6] * height, 0, height)
+        boxes = np.stack([x1, y1, x2 - x1, y2 - y1], axis=1).round().astype(np.int32)
+        if min_size:
+            boxes = boxes[(boxes[:, 2] >= min_size) & (boxes[:, 3] >= min_size)]
+        return boxes
+
+    def detect_batch(self, images, min_size=None):
+        if not images:
+            return []
+        blob = cv2.dnn.blobFromImages(images, 1.0, self.input_size, self.mean, swapRB=False, crop=False)
+        self.net.setInput(blob)
+        detections = self.net.forward().reshape(-1, 7)
+        return [
+            self._boxes(detections, i, image.shape[1], image.shape[0], min_size)
+            for i, image in enumerate(images)
+        ]
+
+    def detect(self, image, min_size=None, max_size=None):
+        boxes = self.detect_batch([image], min_size)[0]
+        if max_size and len(boxes):
+            boxes = boxes[(boxes[:, 2] <= max_size) & (boxes[:, 3] <= max_size)]
+        return boxes
+
+
+BACKENDS = {
+    "haar": HaarBackend,
+    "lbp": LBPBackend,
+    "dnn": DnnBackend,
+}
+
+
+def create_backend(backend=None, **options):
+    """Instancia un backend por nombre ("haar", "lbp", "dnn") o devuelve el dado."""
+    if backend is None:
+        return HaarBackend(**options)
+    if isinstance(backend, DetectorBackend):
+        return backend
+    return BACKENDS[backend](**options)
@@ -1,46 +1,46 @@
-from pynput import mouse, keyboard
-import platform
-
-#Para Windows: utilidad para obtener el título de la ventana activa
-if platform.system() == "Windows":
-    import ctypes
-    from ctypes import wintypes 
-
-    user32 = ctypes.windll.user32
-    GetForegroundWindow = user32.GetForegroundWindow
-    GetWindowTextW = user32.GetWindowTextW
-    GetWindowTextLengthW = user32.GetWindowTextLengthW
-
-    def get_active_window_title() -> str:
-        hwnd = GetForegroundWindow()
-        if hwnd == 0:
-            return ""
-        length = GetWindowTextLengthW(hwnd)
-        if length == 0:
-            return ""
-        buff = ctypes.create_unicode_buffer(length + 1)
-        GetWindowTextW(hwnd, buff, length + 1)
-        return buff.value
-else:
-    #Para otros SO devolvemos cadena vacía en lugar de penalizar
-    def get_active_window_title() -> str:  # type: ignore[override]
-        return ""
+import time
+
+from focus_backends import default_focus_backend
+from input_events import InputEventQueue, InputHistory
 
 
 class EventMonitor:
     """
     Monitorea eventos globales de mouse y teclado
     y detecta si el foco de ventana cambia (sale del examen).
+    El foco lo publica un FocusBackend en segundo plano; check_window solo
+    drena los cambios pendientes, así que el costo por frame es O(1) y los
+    tiempos de salida/regreso usan el timestamp real de cada cambio.
+    Los callbacks de pynput solo encolan (timestamp, tipo) en una
+    InputEventQueue; check_window la drena por lotes y atribuye cada cambio
+    de foco a la última entrada anterior a su timestamp.
+    pynput se importa en start_monitoring, así el monitor se puede usar con
+    entradas sintéticas (input_replay) sin dispositivos ni display; con
+    listen_inputs=False no se arrancan listeners y las entradas se inyectan
+    con input_events.record().
+    Tiempo fuera: se mide entre los timestamps de salida y regreso;
+    out_times() y get_stats() incluyen el tramo abierto hasta clock() y
+    stop_monitoring lo cierra. clock es el reloj de los timestamps
+    (time.time salvo en simulaciones).
     """
 
-    def __init__(self):
+    def __init__(self, focus_backend=None, listen_inputs=True, clock=time.time):
+        #Fuente de cambios de foco (por defecto, la del SO)
+        self.focus = focus_backend if focus_backend is not None else default_focus_backend()
+        self.listen_inputs = listen_inputs
+        self.clock = clock
+
         #Contadores de cambios de pantalla
         self.mouse_window_changes = 0
         self.keyboard_window_changes = 0
 
-        #Último tipo de entrada que se usó
+        #Último tipo de entrada que se usó (hasta el último cambio de foco aplicado)
         self.last_input_type = "unknown"  # "mouse" | "keyboard" | "unknown"
 
+        #Entradas con timestamp: la escriben los listeners, la drena check_window
+        self.input_events = InputEventQueue()
+        self._input_history = InputHistory()
+
         #Título de la ventana del examen
         self.exam_window_title: str | None = None
 
@@ -48,19 +48,25 @@ class EventMonitor:
         self._last_on_exam: bool = True
 
         #Listeners globales
-        self.mouse_listener: mouse.Listener | None = None
-        self.keyboard_listener: keyboard.Listener | None = None
+        self.mouse_listener = None
+        self.keyboard_listener = None
         self.current_out_cause = None  # "mouse" | "keyboard" | None
 
+        #Tiempo fuera del examen medido con los timestamps de los cambios
+        self._out_since: float | None = None
+        self.mouse_out_time = 0.0
+        self.keyboard_out_time = 0.0
+        self.unknown_out_time = 0.0  #salidas sin entrada previa conocida
+
         self.is_running = False
 
     #Callbacks de entrada
     def _on_mouse_click(self, x, y, button, pressed):
         if pressed:
-            self.last_input_type = "mouse"
+            self.input_events.record("mouse")
 
     def _on_key(self, key):
-        self.last_input_type = "keyboard"
+        self.input_events.record("keyboard")
 
     #Control de monitor
     def start_monitoring(self):
@@ -68,32 +74,48 @@ class EventMonitor:
         if self.is_running:
             return
 
-        self.exam_window_title = get_active_window_title() or None
+        if self.listen_inputs:
+            from pynput import mouse, keyboard
+
+        self.focus.start()
+        self.input_events.clear()
+        self._input_history.clear()
+        self.exam_window_title = self.focus.title or None
         print("[EventMonitor] Ventana de examen:", self.exam_window_title)
         self._last_on_exam = True  # asumimos que empezamos dentro
+        self._out_since = None
 
         #Listeners globales
-        self.mouse_listener = mouse.Listener(on_click=self._on_mouse_click)
-        self.keyboard_listener = keyboard.Listener(
-            on_press=self._on_key,
-            on_release=self._on_key,
-        )
-        self.mouse_listener.start()
-        self.keyboard_listener.start()
+        if self.listen_inputs:
+            self.mouse_listener = mouse.Listener(on_click=self._on_mouse_click)
+            self.keyboard_listener = keyboard.Listener(
+                on_press=self._on_key,
+                on_release=self._on_key,
+            )
+            self.mouse_listener.start()
+            self.keyboard_listener.start()
 
         self.is_running = True
 
-    def stop_monitoring(self):
-        """Detiene listeners."""
+    def stop_monitoring(self, now=None):
+        """Detiene listeners y cierra el tramo fuera del examen que siga abierto en `now`."""
         if not self.is_running:
             return
 
+        if self.exam_window_title:
+            self._drain_changes()
+        if self._out_since is not None:
+            now = self.clock() if now is None else now
+            self._add_out_time(self.current_out_cause, max(0.0, now - self._out_since))
+            self._out_since = None
+
         if self.mouse_listener:
             self.mouse_listener.stop()
             self.mouse_listener = None
         if self.keyboard_listener:
             self.keyboard_listener.stop()
             self.keyboard_listener = None
+        self.focus.stop()
 
         self.is_running = False
 
@@ -109,12 +131,40 @@ class EventMonitor:
             #No hay referencia; no penaliza.
             return True, None
 
-        current_title = get_active_window_title()
-        on_exam = (current_title == self.exam_window_title)
+        self._drain_changes()
+
+        #Si esta fuera, devolve la causa actual;
+        #si esta dentro, devolve None.
+        on_exam = self._last_on_exam
+        cause_state = self.current_out_cause if not on_exam else None
+        return on_exam, cause_state
 
+    def _drain_changes(self):
+        #Entradas nuevas, por lote
+        history = self._input_history
+        history.extend(self.input_events.drain())
+
+        #Aplicar en orden todos los cambios de foco publicados desde la última llamada
+        changes = self.focus.changes
+        while changes:
+            ts, title = changes.popleft()
+            self.last_input_type = history.kind_at(ts) or "unknown"
+            self._apply_focus(title == self.exam_window_title, ts)
+
+    def _add_out_time(self, cause, seconds):
+        if cause == "mouse":
+            self.mouse_out_time += seconds
+        elif cause == "keyboard":
+            self.keyboard_out_time += seconds
+        else:
+            self.unknown_out_time += seconds
+
+    def _apply_focus(self, on_exam, ts):
+        """Procesa un cambio de foco ocurrido en el instante `ts`."""
         #Detectar flancos
         if self._last_on_exam and not on_exam:
             #Acaba de salir de la ventana del examen
+            self._out_since = ts
             if self.last_input_type == "mouse":
                 self.mouse_window_changes += 1
                 self.current_out_cause = "mouse"
@@ -126,24 +176,47 @@ class EventMonitor:
 
         elif (not self._last_on_exam) and on_exam:
             #Acaba de regresar a la ventana del examen
+            if self._out_since is not None:
+                self._add_out_time(self.current_out_cause, ts - self._out_since)
+            self._out_since = None
             self.current_out_cause = None
 
         self._last_on_exam = on_exam
 
-        #Si esta fuera, devolve la causa actual;
-        #si esta dentro, devolve None.
-        cause_state = self.current_out_cause if not on_exam else None
-        return on_exam, cause_state
-
     #Stats
-    def get_stats(self):
+    def out_times(self, now=None):
+        """
+        Tiempo fuera del examen por causa ("mouse", "keyboard", None) hasta
+        `now` (por defecto clock()), incluido el tramo abierto si está fuera.
+        """
+        times = {
+            "mouse": self.mouse_out_time,
+            "keyboard": self.keyboard_out_time,
+            None: self.unknown_out_time,
+        }
+        if self._out_since is not None:
+            now = self.clock() if now is None else now
+            times[self.current_out_cause] += max(0.0, now - self._out_since)
+        return times
+
+    def get_stats(self, now=None):
+        times = self.out_times(now)
         return {
             "mouse_changes": self.mouse_window_changes,
             "keyboard_changes": self.keyboard_window_changes,
+            "mouse_out_time": times["mouse"],
+            "keyboard_out_time": times["keyboard"],
         }
 
     def reset_stats(self):
         self.mouse_window_changes = 0
         self.keyboard_window_changes = 0
         self.last_input_type = "unknown"
-        self._last_on_exam = True
\ No newline at end of file
+        self.input_events.clear()
+        self._input_history.clear()
+        self._last_on_exam = True
+        self._out_since = None
+        self.current_out_cause = None
+        self.mouse_out_time = 0.0
+        self.keyboard_out_time = 0.0
+        self.unknown_out_time = 0.0
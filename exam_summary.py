@@ -0,0 +1,49 @@
+#Umbral de no atención (en %) a partir del cual se marca como sospechoso
+SUSPICIOUS_PCT = 40.0
+
+
+def build_summary(results, suspicious_pct=SUSPICIOUS_PCT):
+    """
+    Arma el texto del resumen del examen.
+    - results: dict con total_exam_time, attention_time, no_attention_time,
+      mouse_window_time, keyboard_window_time, face_stats (stats de
+      FaceDetectionModule) y event_stats (stats de EventMonitor).
+    - suspicious_pct: umbral de no atención (%) para marcar sospechoso.
+    Devuelve None si no hay datos suficientes.
+    """
+    total = results["total_exam_time"]
+    if total <= 0:
+        return None
+
+    non_att_pct = (results["no_attention_time"] / total) * 100.0
+    fd_stats = results["face_stats"]
+    em_stats = results["event_stats"]
+
+    summary = []
+    summary.append("--- RESUMEN DEL EXAMEN ---")
+    summary.append(f"Duracion Total: {total:4.1f}s")
+    summary.append(f"Tiempo de Atencion: {results['attention_time']:4.1f}s")
+    summary.append(f"Tiempo de No Atencion: {results['no_attention_time']:4.1f}s")
+    summary.append("")
+    summary.append("--- CAUSAS DE NO ATENCION (GIROS) ---")
+    summary.append(f"Giros Izquierda: {fd_stats['left']:4.1f}s")
+    summary.append(f"Giros Derecha:   {fd_stats['right']:4.1f}s")
+    summary.append(f"Giros Arriba:    {fd_stats['up']:4.1f}s")
+    summary.append(f"Giros Abajo:     {fd_stats['down']:4.1f}s")
+    summary.append("")
+    summary.append("--- CAMBIOS DE PANTALLA ---")
+    summary.append(f"Cambios Mouse (ventana):   {em_stats['mouse_changes']} veces")
+    summary.append(f"Cambios Teclado (ventana): {em_stats['keyboard_changes']} veces")
+    summary.append(
+        f"Tiempo fuera por Mouse:    {results['mouse_window_time']:4.1f}s"
+    )
+    summary.append(
+        f"Tiempo fuera por Teclado:  {results['keyboard_window_time']:4.1f}s"
+    )
+    summary.append("")
+    summary.append("--- EVALUACION ---")
+    summary.append(f"Porcentaje de No Atencion: {non_att_pct:4.1f}%")
+    sospechoso = "SI" if non_att_pct > suspicious_pct else "NO"
+    summary.append(f"Comportamiento Sospechoso (>{suspicious_pct:.0f}%): {sospechoso}")
+
+    return "\n".join(summary)
@@ -1,19 +1,98 @@
 import cv2
 import numpy as np
 
+from detector_backends import create_backend
+from frame_buffers import BufferRing
+
+#Ancho de la imagen de detección: precisión vs. FPS
+DETECTION_PRESETS = {
+    "precision": None,  #resolución completa de la cámara
+    "balanced": 480,
+    "fast": 320,
+}
+
+#Tamaño mínimo de rostro a resolución completa y mínimo absoluto del cascade
+MIN_FACE_SIZE = 60
+MIN_CASCADE_SIZE = 24
+
+#Miniatura (ancho, alto) usada por el detector de cambios
+MOTION_SIZE = (32, 24)
+
+
 class FaceDetectionModule:
     """
     Módulo de detección de rostro y estimación de dirección de cabeza:
-    - Usa Haar cascades para localizar el rostro en cada frame.
+    - Localiza el rostro con un DetectorBackend (por defecto Haar cascade;
+      ver detector_backends: "haar", "lbp", "dnn").
     - Durante unos cuantos frames iniciales calibra una posición "neutral".
     - Después clasifica giros en: left, right, up, down.
     - Acumula TIEMPOS (en segundos) de atención y no atención.
+    Modo tracking (tracking=True):
+    - Cada `redetect_interval` frames, o cuando se pierde el rostro, busca en
+      el frame completo.
+    - Entre medio busca solo en una región (ROI) alrededor del último rostro,
+      ampliada por `roi_padding`, con un rango de tamaños cercano al anterior.
+    Resolución de detección (detection_width):
+    - Ancho en píxeles (o nombre de DETECTION_PRESETS) al que se reduce la
+      imagen gris antes del cascade; las cajas se re-proyectan a coordenadas
+      del frame completo. None detecta a resolución completa.
+    Reglas de dirección (ajustables, ver rescoring.py):
+    - thresh_x_ratio / thresh_y_ratio: umbral relativo al ancho/alto del rostro.
+    - El centro neutral es el primer rostro detectado. Con
+      smooth_calibration=True se promedia sobre calibration_frames rostros
+      (suavizado exponencial calibration_alpha).
+    process_frames() procesa varios frames con una sola llamada de detección
+    por lote (detect_batch del backend) y luego acumula stats en orden.
+    Compuerta de movimiento (motion_threshold):
+    - Antes del backend compara una miniatura gris del frame con la del
+      último frame analizado (diferencia absoluta media, en niveles de gris).
+    - Por debajo del umbral reutiliza las cajas de ese análisis: la dirección
+      y los stats se calculan igual que si se hubiera detectado.
+    - Cada `max_reuse_frames` frames reutilizados se fuerza una detección.
+    None desactiva la compuerta (se detecta en todos los frames).
+    Con reuse_buffers=True process_frame escribe la imagen gris y la reducida
+    en buffers preasignados (uno por resolución) en vez de crear arreglos
+    nuevos en cada frame.
+    Con annotate=False no dibuja la caja ni la etiqueta sobre el frame
+    (modo sin vista previa, p. ej. monitor_daemon).
     """
 
-    def __init__(self):
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-        )
+    def __init__(self, tracking=False, redetect_interval=10, roi_padding=0.5,
+                 detection_width=None, perf=None, thresh_x_ratio=0.25,
+                 thresh_y_ratio=0.15, calibration_frames=30, calibration_alpha=0.1,
+                 backend=None, backend_options=None, reuse_buffers=False,
+                 motion_threshold=None, max_reuse_frames=15, annotate=True,
+                 smooth_calibration=False):
+        #backend: nombre ("haar", "lbp", "dnn") o instancia de DetectorBackend
+        self.backend = create_backend(backend, **(backend_options or {}))
+        #Parámetros de tracking
+        self.tracking = tracking
+        self.redetect_interval = redetect_interval
+        self.roi_padding = roi_padding
+        #Resolución de detección
+        if isinstance(detection_width, str):
+            detection_width = DETECTION_PRESETS[detection_width]
+        self.detection_width = detection_width
+        #Buffers de la imagen de detección (None = se asignan por frame)
+        self.reuse_buffers = reuse_buffers
+        self._gray_ring = BufferRing() if reuse_buffers else None
+        self._small_ring = BufferRing() if reuse_buffers else None
+        #Compuerta de movimiento
+        self.motion_threshold = motion_threshold
+        self.max_reuse_frames = max_reuse_frames
+        self._motion_small = np.empty(MOTION_SIZE[::-1] + (3,), dtype=np.uint8)
+        self._motion_gray = np.empty(MOTION_SIZE[::-1], dtype=np.uint8)
+        self._motion_ref = np.empty(MOTION_SIZE[::-1], dtype=np.uint8)
+        #PerfMonitor opcional (None = sin instrumentación)
+        self.perf = perf
+        #Dibujar caja y dirección sobre el frame
+        self.annotate = annotate
+        #Reglas de dirección
+        self.thresh_x_ratio = thresh_x_ratio
+        self.thresh_y_ratio = thresh_y_ratio
+        self.calibration_alpha = calibration_alpha
+        self.smooth_calibration = smooth_calibration
+        self.max_calibration_frames = calibration_frames  #30 ~ 1 segundo a ~30 FPS
         self.reset_stats()
 
     def reset_stats(self):
@@ -29,8 +108,151 @@ class FaceDetectionModule:
         #Calibración de posición neutral
         self.neutral_center = None
         self.calibration_frames = 0
-        self.max_calibration_frames = 30  #~1 segundo si va a ~30 FPS
         self.last_direction = "center"
+        #Estado de tracking
+        self.last_box = None
+        self.frames_since_full = 0
+        #Estado de la compuerta de movimiento
+        self._last_faces = None  #cajas del último frame analizado
+        self.reused_in_row = 0
+        self.frames_detected = 0
+        self.frames_reused = 0
+
+    def _detection_scale(self, width):
+        """Factor frame -> imagen de detección (1.0 si no se reduce)."""
+        if self.detection_width is None or width <= self.detection_width:
+            return 1.0
+        return self.detection_width / width
+
+    def _min_size(self, scale):
+        return max(MIN_CASCADE_SIZE, int(round(MIN_FACE_SIZE * scale)))
+
+    @staticmethod
+    def _to_frame_coords(faces, scale, offset=(0, 0)):
+        """Suma el offset del ROI y re-proyecta cajas a coordenadas del frame completo."""
+        if len(faces) == 0:
+            return ()
+        faces = faces.astype(np.float64)
+        faces[:, 0] += offset[0]
+        faces[:, 1] += offset[1]
+        if scale != 1.0:
+            faces /= scale
+        return np.round(faces).astype(np.int32)
+
+    def _detection_image(self, frame, reuse=False):
+        """
+        Imagen para el backend (gris o BGR) reducida una sola vez según
+        detection_width. Devuelve (imagen, escala).
+        - reuse: escribe en los buffers del módulo; la imagen solo es válida
+          hasta el próximo frame (no sirve para lotes).
+        """
+        if self.backend.color:
+            image = frame
+        elif reuse:
+            image = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray_ring.next(frame.shape[:2]))
+        else:
+            image = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        scale = self._detection_scale(image.shape[1])
+        if scale != 1.0:
+            h, w = image.shape[:2]
+            size = (int(round(w * scale)), int(round(h * scale)))
+            dst = self._small_ring.next((size[1], size[0]) + image.shape[2:]) if reuse else None
+            image = cv2.resize(image, size, dst=dst, interpolation=cv2.INTER_AREA)
+        return image, scale
+
+    def _detect_full(self, image, scale):
+        faces = self.backend.detect(image, min_size=self._min_size(scale))
+        return self._to_frame_coords(faces, scale)
+
+    def _detect_roi(self, image, box, scale):
+        """Busca el rostro solo alrededor de `box`; devuelve cajas en coordenadas del frame."""
+        #Caja del frame completo -> coordenadas de la imagen de detección
+        x, y, w, h = (int(round(v * scale)) for v in box)
+        img_h, img_w = image.shape[:2]
+        pad_x = int(w * self.roi_padding)
+        pad_y = int(h * self.roi_padding)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1, y1 = min(img_w, x + w + pad_x), min(img_h, y + h + pad_y)
+
+        #Rango de tamaños derivado del rostro anterior
+        side = min(w, h)
+        min_side = max(self._min_size(scale), int(side * 0.7))
+        max_side = int(max(w, h) * 1.4)
+        if x1 - x0 < min_side or y1 - y0 < min_side:
+            return ()
+
+        faces = self.backend.detect(image[y0:y1, x0:x1], min_size=min_side, max_size=max_side)
+        return self._to_frame_coords(faces, scale, (x0, y0))
+
+    def _detect_faces(self, image, scale):
+        """
+        Detección completa o en ROI según el modo de tracking.
+        Devuelve cajas en coordenadas del frame completo.
+        """
+        if not self.tracking:
+            return self._detect_full(image, scale)
+
+        if self.last_box is not None and self.frames_since_full < self.redetect_interval:
+            faces = self._detect_roi(image, self.last_box, scale)
+            if len(faces) > 0:
+                self.frames_since_full += 1
+                return faces
+
+        #Re-detección periódica o rostro perdido
+        self.frames_since_full = 0
+        return self._detect_full(image, scale)
+
+    def detect_batch(self, frames):
+        """
+        Detecta rostros en varios frames (de uno o varios streams) con una
+        sola llamada al backend. Devuelve una lista de cajas por frame en
+        coordenadas de cada frame. No usa ni modifica el estado de tracking.
+        """
+        prepared = [self._detection_image(frame) for frame in frames]
+        groups = {}
+        for i, (image, scale) in enumerate(prepared):
+            groups.setdefault(self._min_size(scale), []).append(i)
+
+        results = [None] * len(frames)
+        for min_size, indices in groups.items():
+            boxes = self.backend.detect_batch([prepared[i][0] for i in indices], min_size=min_size)
+            for i, faces in zip(indices, boxes):
+                results[i] = self._to_frame_coords(faces, prepared[i][1])
+        return results
+
+    def process_frames(self, frames, dts):
+        """
+        Versión por lotes de process_frame: una detección para todos los
+        frames y luego clasificación y stats en orden. No usa tracking ni
+        la compuerta de movimiento (todos los frames cuentan como detectados).
+        Devuelve una lista de (frame_annotated, is_attentive, direction).
+        """
+        perf = self.perf
+        if perf:
+            t0 = perf.clock()
+        all_faces = self.detect_batch(frames)
+        if perf:
+            perf.lap("detect_batch", t0)
+        self.frames_detected += len(frames)
+        return [
+            self._apply_faces(frame, faces, dt)
+            for frame, faces, dt in zip(frames, all_faces, dts)
+        ]
+
+    def _is_static(self, frame):
+        """
+        True si el frame casi no cambió respecto del último analizado.
+        Si cambió, la miniatura actual pasa a ser la nueva referencia.
+        """
+        cv2.resize(frame, MOTION_SIZE, dst=self._motion_small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._motion_small, cv2.COLOR_BGR2GRAY, dst=self._motion_gray)
+        if (self._last_faces is not None
+                and self.reused_in_row < self.max_reuse_frames
+                and cv2.norm(self._motion_gray, self._motion_ref, cv2.NORM_L1)
+                < self.motion_threshold * self._motion_gray.size):
+            return True
+        self._motion_ref, self._motion_gray = self._motion_gray, self._motion_ref
+        return False
 
     def process_frame(self, frame, dt):
         """
@@ -43,37 +265,72 @@ class FaceDetectionModule:
         - is_attentive: bool, True si consideramos que el alumno miró al frente.
         - direction: string con la última dirección estimada.
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(60, 60),
-            flags=cv2.CASCADE_SCALE_IMAGE,
-        )
+        perf = self.perf
+        if self.motion_threshold is not None:
+            if perf:
+                t0 = perf.clock()
+            static = self._is_static(frame)
+            if perf:
+                perf.lap("motion", t0)
+            if static:
+                self.reused_in_row += 1
+                self.frames_reused += 1
+                return self._apply_faces(frame, self._last_faces, dt)
+            self.reused_in_row = 0
+
+        if perf:
+            t0 = perf.clock()
+        image, scale = self._detection_image(frame, self.reuse_buffers)
+        if perf:
+            t0 = perf.lap("gray", t0)
+        faces = self._detect_faces(image, scale)
+        if perf:
+            perf.lap("detect", t0)
+        self._last_faces = faces
+        self.frames_detected += 1
+        return self._apply_faces(frame, faces, dt)
+
+    @staticmethod
+    def _largest_face(faces):
+        """Caja de mayor área (la primera si hay empate), sin ordenar ni crear listas."""
+        best = 0
+        best_area = -1
+        for i in range(len(faces)):
+            area = faces[i][2] * faces[i][3]
+            if area > best_area:
+                best, best_area = i, area
+        return faces[best]
+
+    def _apply_faces(self, frame, faces, dt):
+        """Clasifica la dirección con las cajas detectadas, acumula stats y anota el frame."""
+        perf = self.perf
+        if perf:
+            t0 = perf.clock()
 
         gaze_direction = "center"
         is_attentive = True
 
         if len(faces) > 0:
             #Toma el rostro más grande
-            faces_sorted = sorted(faces, key=lambda f: f[2] * f[3], reverse=True)
-            x, y, w, h = faces_sorted[0]
+            x, y, w, h = self._largest_face(faces)
+            self.last_box = (x, y, w, h)
             cx = x + w // 2
             cy = y + h // 2
 
             #Dibujar bbox (para señalar el rostro)
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+            if self.annotate:
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
 
             #Fase de calibración: asumime que el alumno está "mirando al frente"
-            if self.neutral_center is None and self.calibration_frames < self.max_calibration_frames:
+            if ((self.neutral_center is None or self.smooth_calibration)
+                    and self.calibration_frames < self.max_calibration_frames):
                 self.calibration_frames += 1
                 if self.neutral_center is None:
                     self.neutral_center = (float(cx), float(cy))
                 else:
                     #Promedio exponencial suave
                     nx, ny = self.neutral_center
-                    alpha = 0.1
+                    alpha = self.calibration_alpha
                     self.neutral_center = (nx * (1 - alpha) + cx * alpha,
                                            ny * (1 - alpha) + cy * alpha)
                 #Durante la calibración se considera atento
@@ -89,8 +346,8 @@ class FaceDetectionModule:
                     center_x, center_y = self.neutral_center
 
                 #Umbral relativo al tamaño del rostro (más robusto que píxeles fijos)
-                thresh_x = w * 0.25
-                thresh_y = h * 0.15
+                thresh_x = w * self.thresh_x_ratio
+                thresh_y = h * self.thresh_y_ratio
 
                 dx = cx - center_x
                 dy = cy - center_y
@@ -118,6 +375,7 @@ class FaceDetectionModule:
 
             self.last_direction = gaze_direction
         else:
+            self.last_box = None
             #No se detectó el rostro: se cuenta como no atención por pérdida de cara.
             is_attentive = False
             if dt > 0:
@@ -125,18 +383,30 @@ class FaceDetectionModule:
             gaze_direction = "not_detected"
 
         #Etiqueta visual
-        cv2.putText(
-            frame,
-            f"Direccion: {gaze_direction}",
-            (10, 30),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.7,
-            (0, 255, 0),
-            2,
-            cv2.LINE_AA,
-        )
+        if self.annotate:
+            cv2.putText(
+                frame,
+                f"Direccion: {gaze_direction}",
+                (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.7,
+                (0, 255, 0),
+                2,
+                cv2.LINE_AA,
+            )
+        if perf:
+            perf.lap("classify", t0)
 
         return frame, is_attentive, gaze_direction
 
     def get_stats(self):
-        return dict(self.stats)
\ No newline at end of file
+        return dict(self.stats)
+
+    def get_gate_stats(self):
+        """Frames con detección vs. reutilizados por la compuerta de movimiento."""
+        total = self.frames_detected + self.frames_reused
+        return {
+            "detected": self.frames_detected,
+            "reused": self.frames_reused,
+            "reused_pct": self.frames_reused / total * 100.0 if total else 0.0,
+        }
\ No newline at end of file
@@ -0,0 +1,318 @@
+import platform
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+
+
+class FocusBackend:
+    """
+    Fuente de cambios de foco (ventana activa).
+    Un hilo de fondo publica cada cambio con su timestamp:
+    - title: título de la ventana activa (cacheado, lectura O(1)).
+    - changed_at: time.time() del último cambio.
+    - changes: cola acotada de (timestamp, título) que EventMonitor drena.
+    Un cambio de título dentro de la misma ventana (p. ej. otra pestaña del
+    navegador) también es un cambio de foco.
+    Las subclases implementan _run() (hilo watcher) y _read_title().
+    """
+
+    max_changes = 1024
+
+    def __init__(self):
+        self.title = ""
+        self.changed_at = None
+        self.changes = deque(maxlen=self.max_changes)
+        #Puede publicar más de un hilo (ventana activa y título)
+        self._publish_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    #Control
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self.changes.clear()
+        self.title = self._read_title()
+        self.changed_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="focus-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._wake()
+        self._thread.join(1.0)
+        self._thread = None
+
+    #Publicación
+    def _publish(self, title, timestamp=None):
+        with self._publish_lock:
+            if title == self.title:
+                return
+            ts = time.time() if timestamp is None else timestamp
+            self.title = title
+            self.changed_at = ts
+            self.changes.append((ts, title))
+
+    #A implementar
+    def _read_title(self) -> str:
+        return ""
+
+    def _run(self):
+        self._stop_event.wait()
+
+    def _wake(self):
+        """Despierta al hilo watcher para que vea el pedido de stop."""
+
+
+class NullFocusBackend(FocusBackend):
+    """Sin información de foco: el título siempre es "" (no penaliza)."""
+
+
+class FakeFocusBackend(FocusBackend):
+    """Backend para pruebas: los cambios se inyectan con set_focus()."""
+
+    def __init__(self, title=""):
+        super().__init__()
+        self._initial_title = title
+        self.title = title
+
+    def _read_title(self) -> str:
+        return self.title or self._initial_title
+
+    def set_focus(self, title, timestamp=None):
+        self._publish(title, timestamp)
+
+
+class PollingFocusBackend(FocusBackend):
+    """Consulta una función de título a intervalo fijo y publica solo los cambios."""
+
+    def __init__(self, title_fn, interval=0.05):
+        super().__init__()
+        self.title_fn = title_fn
+        self.interval = interval
+
+    def _read_title(self) -> str:
+        return self.title_fn()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._publish(self.title_fn())
+
+
+class WindowsFocusBackend(FocusBackend):
+    """
+    Windows: SetWinEventHook en el hilo watcher, sin sondeo:
+    - EVENT_SYSTEM_FOREGROUND: cambio de ventana en primer plano.
+    - EVENT_OBJECT_NAMECHANGE: cambio de título; solo cuenta el de la
+      ventana en primer plano (p. ej. otra pestaña del navegador).
+    """
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    OBJID_WINDOW = 0
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WM_QUIT = 0x0012
+
+    def __init__(self):
+        super().__init__()
+        import ctypes
+        from ctypes import wintypes
+
+        self._ctypes = ctypes
+        self._wintypes = wintypes
+        self._user32 = ctypes.windll.user32
+        self._kernel32 = ctypes.windll.kernel32
+        self._thread_id = None
+
+    def _window_title(self, hwnd) -> str:
+        if not hwnd:
+            return ""
+        length = self._user32.GetWindowTextLengthW(hwnd)
+        if length == 0:
+            return ""
+        buff = self._ctypes.create_unicode_buffer(length + 1)
+        self._user32.GetWindowTextW(hwnd, buff, length + 1)
+        return buff.value
+
+    def _read_title(self) -> str:
+        return self._window_title(self._user32.GetForegroundWindow())
+
+    def _run(self):
+        ctypes, wintypes = self._ctypes, self._wintypes
+        self._thread_id = self._kernel32.GetCurrentThreadId()
+
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD,
+        )
+
+        def callback(hook, event, hwnd, id_object, id_child, thread, event_time):
+            if event == self.EVENT_OBJECT_NAMECHANGE:
+                #Cambios de nombre de controles u otras ventanas: se ignoran
+                if id_object != self.OBJID_WINDOW or hwnd != self._user32.GetForegroundWindow():
+                    return
+            self._publish(self._window_title(hwnd))
+
+        #Hay que mantener la referencia viva mientras los hooks existan
+        self._callback = WinEventProc(callback)
+        hooks = [
+            self._user32.SetWinEventHook(
+                event, event, 0, self._callback, 0, 0, self.WINEVENT_OUTOFCONTEXT,
+            )
+            for event in (self.EVENT_SYSTEM_FOREGROUND, self.EVENT_OBJECT_NAMECHANGE)
+        ]
+        msg = wintypes.MSG()
+        try:
+            while not self._stop_event.is_set():
+                if self._user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) <= 0:
+                    break
+                self._user32.TranslateMessage(ctypes.byref(msg))
+                self._user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            for hook in hooks:
+                if hook:
+                    self._user32.UnhookWinEvent(hook)
+
+    def _wake(self):
+        if self._thread_id is not None:
+            self._user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+
+
+class X11FocusBackend(FocusBackend):
+    """
+    Linux/X11: `xprop -spy` sobre _NET_ACTIVE_WINDOW de la ventana raíz
+    (una línea por cada cambio de ventana activa) y otro `xprop -spy` sobre
+    _NET_WM_NAME / WM_NAME de la ventana activa (cambios de título, p. ej.
+    otra pestaña del navegador), que se reinicia al cambiar de ventana.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._proc = None
+        self._title_proc = None
+        self._active_id = None
+
+    @staticmethod
+    def available() -> bool:
+        return shutil.which("xprop") is not None
+
+    @staticmethod
+    def _parse_window_id(line):
+        #"_NET_ACTIVE_WINDOW(WINDOW): window id # 0x3a00007"
+        if "#" not in line:
+            return None
+        window_id = line.rsplit("#", 1)[1].strip().split(",")[0]
+        return window_id if window_id not in ("0x0", "") else None
+
+    @staticmethod
+    def _title_of(window_id) -> str:
+        if window_id is None:
+            return ""
+        try:
+            out = subprocess.run(
+                ["xprop", "-id", window_id, "_NET_WM_NAME", "WM_NAME"],
+                capture_output=True, text=True, timeout=1.0,
+            ).stdout
+        except (OSError, subprocess.SubprocessError):
+            return ""
+        for line in out.splitlines():
+            title = X11FocusBackend._parse_title(line)
+            if title is not None:
+                return title
+        return ""
+
+    @staticmethod
+    def _parse_title(line):
+        #'_NET_WM_NAME(UTF8_STRING) = "Examen - Navegador"'
+        if "=" not in line:
+            return None
+        value = line.split("=", 1)[1].strip()
+        if value.startswith('"') and value.endswith('"'):
+            return value[1:-1]
+        return None
+
+    def _read_title(self) -> str:
+        try:
+            out = subprocess.run(
+                ["xprop", "-root", "_NET_ACTIVE_WINDOW"],
+                capture_output=True, text=True, timeout=1.0,
+            ).stdout
+        except (OSError, subprocess.SubprocessError):
+            return ""
+        return self._title_of(self._parse_window_id(out))
+
+    def _run(self):
+        try:
+            self._proc = subprocess.Popen(
+                ["xprop", "-spy", "-root", "_NET_ACTIVE_WINDOW"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+            )
+        except OSError:
+            return
+        for line in self._proc.stdout:
+            if self._stop_event.is_set():
+                break
+            ts = time.time()
+            window_id = self._parse_window_id(line)
+            self._publish(self._title_of(window_id), ts)
+            if window_id != self._active_id:
+                self._watch_title(window_id)
+        self._stop_title_watch()
+
+    def _watch_title(self, window_id):
+        """Reemplaza el espía de título por uno sobre la nueva ventana activa."""
+        self._stop_title_watch()
+        self._active_id = window_id
+        if window_id is None:
+            return
+        try:
+            proc = subprocess.Popen(
+                ["xprop", "-spy", "-id", window_id, "_NET_WM_NAME", "WM_NAME"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+            )
+        except OSError:
+            return
+        self._title_proc = proc
+        threading.Thread(
+            target=self._read_titles, args=(proc, window_id), name="focus-title", daemon=True
+        ).start()
+
+    def _read_titles(self, proc, window_id):
+        has_net_name = False
+        for line in proc.stdout:
+            if self._stop_event.is_set() or window_id != self._active_id:
+                break
+            #_NET_WM_NAME (UTF-8) tiene prioridad sobre WM_NAME si la ventana lo usa
+            if line.startswith("_NET_WM_NAME"):
+                has_net_name = True
+            elif has_net_name:
+                continue
+            title = self._parse_title(line)
+            if title is not None:
+                self._publish(title, time.time())
+
+    def _stop_title_watch(self):
+        proc, self._title_proc = self._title_proc, None
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+
+    def _wake(self):
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+        self._stop_title_watch()
+
+
+def default_focus_backend() -> FocusBackend:
+    """Elige el backend según el sistema operativo."""
+    system = platform.system()
+    if system == "Windows":
+        return WindowsFocusBackend()
+    if system == "Linux" and X11FocusBackend.available():
+        return X11FocusBackend()
+    #Sin backend disponible: no penaliza
+    return NullFocusBackend()
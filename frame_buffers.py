@@ -0,0 +1,42 @@
+import numpy as np
+
+
+class BufferRing:
+    """
+    Anillo de `slots` buffers preasignados de la misma forma.
+    - next(shape): devuelve el siguiente buffer del anillo; solo se
+      (re)asigna memoria cuando cambia la forma (p. ej. otra resolución).
+    Con varios slots, un buffer entregado no se vuelve a escribir hasta
+    `slots - 1` llamadas después: alcanza con que ese sea el máximo de
+    frames en vuelo entre hilos (cola + el que se procesa + el que se muestra).
+    """
+
+    def __init__(self, slots=1, dtype=np.uint8):
+        self.slots = slots
+        self.dtype = dtype
+        self.allocations = 0
+        self._buffers = []
+        self._shape = None
+        self._index = 0
+
+    def next(self, shape):
+        if shape != self._shape:
+            self._buffers = [np.empty(shape, dtype=self.dtype) for _ in range(self.slots)]
+            self._shape = shape
+            self._index = 0
+            self.allocations += 1
+        buf = self._buffers[self._index]
+        self._index = (self._index + 1) % self.slots
+        return buf
+
+
+def read_into(cap, ring, shape):
+    """
+    cap.read() escribiendo en el siguiente buffer del anillo.
+    `shape` es la forma del frame anterior (None la primera vez: se deja
+    asignar a OpenCV). Si la cámara cambia de resolución, OpenCV devuelve
+    un arreglo nuevo y el anillo se reasigna en la próxima llamada.
+    """
+    if shape is None:
+        return cap.read()
+    return cap.read(ring.next(shape))
@@ -0,0 +1,276 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from frame_buffers import BufferRing, read_into
+
+
+class DropQueue:
+    """
+    Cola acotada entre etapas del pipeline.
+    Cuando está llena aplica una política de descarte:
+    - "oldest": descarta el elemento más viejo y encola el nuevo (por defecto).
+    - "newest": descarta el elemento nuevo y conserva los pendientes.
+    - "block":  espera a que haya lugar (sin descartar).
+    """
+
+    POLICIES = ("oldest", "newest", "block")
+
+    def __init__(self, maxsize=2, drop_policy="oldest"):
+        if maxsize < 1:
+            raise ValueError("maxsize debe ser >= 1")
+        if drop_policy not in self.POLICIES:
+            raise ValueError(f"Política de descarte desconocida: {drop_policy}")
+        self.maxsize = maxsize
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, item):
+        """Encola un elemento. Devuelve False si algún elemento fue descartado."""
+        with self._cond:
+            if self.drop_policy == "block":
+                while len(self._items) >= self.maxsize and not self._closed:
+                    self._cond.wait()
+            elif len(self._items) >= self.maxsize:
+                self.dropped += 1
+                if self.drop_policy == "newest":
+                    return False
+                self._items.popleft()
+                self._items.append(item)
+                self._cond.notify_all()
+                return False
+            if self._closed:
+                return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Saca el siguiente elemento; devuelve None si se cerró o venció el timeout."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._items.clear()
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+def to_pil_rgb(frame):
+    """Render por defecto: frame BGR -> imagen PIL RGB."""
+    return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+
+class FramePipeline:
+    """
+    Pipeline en etapas captura -> detección -> render:
+    - Hilo de captura: lee de la cámara a su propio ritmo y marca cada frame
+      con la hora de captura.
+    - Hilo de detección: aplica `process_fn(frame, timestamp)` y entrega el
+      frame anotado.
+    - Hilo de render: aplica `render_fn` al frame anotado (por defecto lo
+      convierte a imagen PIL RGB). Con render_fn=None no hay hilo de render
+      y `latest()` entrega directamente el frame BGR anotado.
+    Las etapas se conectan con colas acotadas (DropQueue) y la GUI solo lee
+    el último resultado terminado con `latest()`.
+
+    Con un `scheduler` (AdaptiveScheduler) el hilo de detección espera entre
+    frames lo que el planificador indique según el costo medido.
+
+    Como cada frame lleva su hora de captura, `process_fn` puede calcular dt
+    entre frames procesados: el tiempo de los frames descartados se acumula
+    en el siguiente frame que sí se procesa.
+
+    Con buffer_slots la captura escribe en un anillo de buffers preasignados
+    (frame_buffers.BufferRing) en vez de asignar un frame nuevo por lectura;
+    debe cubrir los frames en vuelo (queue_size + 2 como mínimo). El anillo
+    no sabe qué frames siguen en uso: ese tamaño alcanza con el ritmo de una
+    cámara en vivo (la detección termina un frame antes de que se capturen
+    buffer_slots más) o con drop_policy="block". Con una fuente que entrega
+    frames más rápido y política de descarte, la captura puede reescribir
+    el frame que se está detectando.
+
+    Con copy_latest=True (render_fn=None) cada frame anotado se copia a uno
+    de tres buffers propios del pipeline antes de publicarlo: el que se
+    escribe, el último publicado y el que tiene la GUI desde su último
+    latest() nunca coinciden. Sirve cuando process_fn devuelve un buffer
+    que reutiliza (p. ej. el anillo del espejo con reuse_buffers) y que el
+    hilo de detección volvería a escribir mientras la GUI lo muestra.
+    """
+
+    def __init__(self, cap, process_fn, queue_size=2, drop_policy="oldest", perf=None,
+                 render_fn=to_pil_rgb, scheduler=None, buffer_slots=None, copy_latest=False):
+        self.cap = cap
+        self.process_fn = process_fn
+        self.render_fn = render_fn
+        self.scheduler = scheduler
+        #PerfMonitor opcional (None = sin instrumentación)
+        self.perf = perf
+
+        self.capture_ring = BufferRing(buffer_slots) if buffer_slots else None
+
+        self.capture_queue = DropQueue(queue_size, drop_policy)
+        self.render_queue = DropQueue(queue_size, drop_policy)
+
+        #Último resultado terminado y su versión
+        self._latest = None
+        self._latest_version = 0
+        self._latest_lock = threading.Lock()
+        #Buffers de publicación (copy_latest): índice del publicado y del de la GUI
+        self.copy_latest = copy_latest
+        self._publish_buffers = [None, None, None]
+        self._latest_index = None
+        self._reader_index = None
+
+        #Estado de la cámara
+        self.read_failed = False
+        self.frames_captured = 0
+        self.frames_processed = 0
+
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    #Control
+    def start(self):
+        if self._threads:
+            return
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="captura", daemon=True),
+            threading.Thread(target=self._detect_loop, name="deteccion", daemon=True),
+        ]
+        if self.render_fn is not None:
+            self._threads.append(
+                threading.Thread(target=self._render_loop, name="render", daemon=True)
+            )
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        self.capture_queue.close()
+        self.render_queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    #Etapas
+    def _capture_loop(self):
+        perf = self.perf
+        ring = self.capture_ring
+        shape = None
+        while not self._stop_event.is_set():
+            if perf:
+                t0 = perf.clock()
+            if ring is not None:
+                ret, frame = read_into(self.cap, ring, shape)
+            else:
+                ret, frame = self.cap.read()
+            #Las fuentes de frame_sources traen su propio timestamp
+            timestamp = getattr(self.cap, "last_timestamp", None)
+            if timestamp is None:
+                timestamp = time.time()
+            if not ret:
+                self.read_failed = True
+                time.sleep(0.05)
+                continue
+            shape = frame.shape
+            if perf:
+                perf.lap("camera_read", t0)
+            self.read_failed = False
+            self.frames_captured += 1
+            if not self.capture_queue.put((frame, timestamp)) and perf:
+                perf.count("dropped")
+
+    def _detect_loop(self):
+        while not self._stop_event.is_set():
+            item = self.capture_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            frame, timestamp = item
+            start = time.perf_counter()
+            processed_frame = self.process_fn(frame, timestamp)
+            self.frames_processed += 1
+            if self.perf:
+                self.perf.frame()
+            if self.render_fn is None:
+                if self.copy_latest:
+                    self._publish_copy(processed_frame)
+                else:
+                    self._publish(processed_frame)
+            elif not self.render_queue.put(processed_frame) and self.perf:
+                self.perf.count("dropped")
+
+            if self.scheduler is not None:
+                delay = self.scheduler.next_delay(time.perf_counter() - start)
+                if delay > 0:
+                    self._stop_event.wait(delay)
+
+    def _render_loop(self):
+        perf = self.perf
+        while not self._stop_event.is_set():
+            processed_frame = self.render_queue.get(timeout=0.1)
+            if processed_frame is None:
+                continue
+            if perf:
+                t0 = perf.clock()
+            rendered = self.render_fn(processed_frame)
+            if perf:
+                perf.lap("render", t0)
+            self._publish(rendered)
+
+    def _publish(self, result):
+        with self._latest_lock:
+            self._latest = result
+            self._latest_version += 1
+
+    def _publish_copy(self, frame):
+        """Copia el frame a un buffer que nadie está leyendo y lo publica."""
+        with self._latest_lock:
+            busy = (self._latest_index, self._reader_index)
+            index = next(i for i in range(3) if i not in busy)
+        buf = self._publish_buffers[index]
+        if buf is None or buf.shape != frame.shape:
+            buf = self._publish_buffers[index] = np.empty_like(frame)
+        np.copyto(buf, frame)
+        with self._latest_lock:
+            self._latest = buf
+            self._latest_index = index
+            self._latest_version += 1
+
+    #Salida
+    def latest(self):
+        """
+        Devuelve (version, resultado) del último frame terminado.
+        Con copy_latest el buffer devuelto no se reescribe hasta la próxima
+        llamada a latest() (un solo lector, el hilo de la GUI).
+        """
+        with self._latest_lock:
+            self._reader_index = self._latest_index
+            return self._latest_version, self._latest
+
+    def get_stats(self):
+        return {
+            "captured": self.frames_captured,
+            "processed": self.frames_processed,
+            "dropped_capture": self.capture_queue.dropped,
+            "dropped_render": self.render_queue.dropped,
+        }
@@ -0,0 +1,84 @@
+import time
+
+
+class AdaptiveScheduler:
+    """
+    Ajusta el intervalo de análisis según el costo medido de cada frame:
+    - cpu_budget: fracción del tiempo de pared que puede usar el análisis
+      (0.5 = como mucho la mitad). El intervalo mínimo es costo / cpu_budget.
+    - target_fps: tope de frecuencia de análisis (None = sin tope).
+    - Mientras la dirección de la cabeza no cambia durante `stable_frames`
+      frames, el intervalo se multiplica por `stable_factor` (hasta
+      max_interval); cualquier cambio vuelve al ritmo normal.
+    Los tiempos de atención no dependen del intervalo porque dt se mide con
+    los timestamps de los frames.
+    """
+
+    def __init__(self, cpu_budget=0.5, target_fps=None, min_interval=0.005,
+                 max_interval=0.5, stable_frames=30, stable_factor=2.0, smoothing=0.2):
+        self.cpu_budget = cpu_budget
+        self.target_fps = target_fps
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.stable_frames = stable_frames
+        self.stable_factor = stable_factor
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self):
+        self.avg_cost = None
+        self.interval = self.min_interval
+        self._last_state = None
+        self._stable_count = 0
+        self._last_tick = None
+        self._avg_period = None
+        self.frames = 0
+
+    def observe(self, state):
+        """Informa el estado del frame (p. ej. la dirección de la cabeza)."""
+        if state == self._last_state:
+            self._stable_count += 1
+        else:
+            self._stable_count = 0
+            self._last_state = state
+
+    def next_delay(self, cost):
+        """
+        Registra el costo (s) del frame recién procesado y devuelve cuánto
+        esperar (s) antes de procesar el siguiente.
+        """
+        now = time.perf_counter()
+        if self._last_tick is not None:
+            period = now - self._last_tick
+            self._avg_period = period if self._avg_period is None else (
+                self._avg_period * (1 - self.smoothing) + period * self.smoothing
+            )
+        self._last_tick = now
+        self.frames += 1
+
+        self.avg_cost = cost if self.avg_cost is None else (
+            self.avg_cost * (1 - self.smoothing) + cost * self.smoothing
+        )
+
+        interval = self.avg_cost / self.cpu_budget if self.cpu_budget > 0 else self.avg_cost
+        if self.target_fps:
+            interval = max(interval, 1.0 / self.target_fps)
+        if self.stable_frames and self._stable_count >= self.stable_frames:
+            interval *= self.stable_factor
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+
+        return max(0.0, self.interval - cost)
+
+    def achieved_fps(self):
+        if not self._avg_period:
+            return 0.0
+        return 1.0 / self._avg_period
+
+    def get_stats(self):
+        return {
+            "achieved_fps": self.achieved_fps(),
+            "scheduled_fps": 1.0 / self.interval if self.interval > 0 else 0.0,
+            "avg_cost_ms": (self.avg_cost or 0.0) * 1000.0,
+            "stable": self.stable_frames > 0 and self._stable_count >= self.stable_frames,
+            "frames": self.frames,
+        }
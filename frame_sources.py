@@ -0,0 +1,219 @@
+"""
+Fuentes de frames intercambiables para la app, el servidor y los benchmarks.
+
+Todas imitan la interfaz de cv2.VideoCapture (read(image=None) -> (ret,
+frame), isOpened(), release()) y además llevan el timestamp de cada frame:
+- last_timestamp: instante (s) del último frame leído, en el reloj de la fuente.
+- clock(): hora actual en ese mismo reloj (para medir dt contra el frame
+  anterior, p. ej. al iniciar el examen).
+- shape: forma de los frames (None si no se conoce antes de leer).
+
+CameraSource usa time.time() como reloj. Las fuentes grabadas (video,
+secuencia de imágenes, sintética) usan los timestamps propios del contenido,
+así el resultado no depende de la velocidad de la máquina:
+- realtime=True: read() espera hasta la hora de cada frame (ritmo real).
+- realtime=False: entrega los frames tan rápido como se pidan.
+"""
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class FrameSource:
+    """Base: pacing opcional a tiempo real sobre los timestamps de _next_frame()."""
+
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+        #True solo para fuentes en vivo (una lectura fallida no es fin de grabación)
+        self.live = False
+        self.last_timestamp = None
+        self.frames_read = 0
+        self.shape = None
+        self._pace_origin = None
+
+    #A implementar
+    def _next_frame(self, image):
+        """Devuelve (frame, timestamp) o None al terminar."""
+        raise NotImplementedError
+
+    #Interfaz tipo cv2.VideoCapture
+    def read(self, image=None):
+        item = self._next_frame(image)
+        if item is None:
+            return False, None
+        frame, ts = item
+        if self.realtime:
+            self._pace(ts)
+        self.last_timestamp = ts
+        self.frames_read += 1
+        return True, frame
+
+    def clock(self):
+        return self.last_timestamp if self.last_timestamp is not None else 0.0
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+    def _pace(self, ts):
+        now = time.perf_counter()
+        if self._pace_origin is None:
+            self._pace_origin = now - ts
+            return
+        wait = self._pace_origin + ts - now
+        if wait > 0:
+            time.sleep(wait)
+
+    @staticmethod
+    def _into(image, frame):
+        """Copia `frame` al buffer `image` si se dio uno de la misma forma."""
+        if image is None or image.shape != frame.shape:
+            return frame
+        np.copyto(image, frame)
+        return image
+
+
+class CameraSource(FrameSource):
+    """Cámara en vivo (cv2.VideoCapture); el timestamp es la hora de lectura."""
+
+    def __init__(self, index=0):
+        super().__init__(realtime=False)
+        self.live = True
+        self.cap = cv2.VideoCapture(index)
+
+    def _next_frame(self, image):
+        ret, frame = self.cap.read(image) if image is not None else self.cap.read()
+        if not ret:
+            return None
+        return frame, time.time()
+
+    def clock(self):
+        return time.time()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(FrameSource):
+    """Archivo de video; usa los timestamps del contenedor (o índice / fps)."""
+
+    def __init__(self, path, realtime=False):
+        super().__init__(realtime)
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"No se pudo abrir el video: {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.index = 0
+        ret, frame = self.cap.read()
+        if not ret:
+            raise RuntimeError(f"Video vacío: {path}")
+        self._pending = frame
+        self.shape = frame.shape
+
+    def _next_frame(self, image):
+        if self._pending is not None:
+            frame, self._pending = self._pending, None
+            frame = self._into(image, frame)
+        else:
+            ret, frame = self.cap.read(image) if image is not None else self.cap.read()
+            if not ret:
+                return None
+        msec = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        ts = msec / 1000.0 if msec > 0 else self.index / self.fps
+        self.index += 1
+        return frame, ts
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageSequenceSource(FrameSource):
+    """
+    Secuencia de imágenes (directorio o patrón glob), en orden de nombre,
+    a `fps` cuadros por segundo.
+    """
+
+    def __init__(self, pattern, fps=30.0, realtime=False):
+        super().__init__(realtime)
+        if os.path.isdir(pattern):
+            paths = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                     if name.lower().endswith(IMAGE_EXTENSIONS)]
+        else:
+            paths = glob.glob(pattern)
+        self.paths = sorted(paths)
+        if not self.paths:
+            raise RuntimeError(f"No hay imágenes en: {pattern}")
+        self.fps = fps
+        self.index = 0
+        first = cv2.imread(self.paths[0])
+        if first is None:
+            raise RuntimeError(f"No se pudo leer la imagen: {self.paths[0]}")
+        self.shape = first.shape
+
+    def _next_frame(self, image):
+        if self.index >= len(self.paths):
+            return None
+        frame = cv2.imread(self.paths[self.index])
+        if frame is None:
+            return None
+        ts = self.index / self.fps
+        self.index += 1
+        return self._into(image, frame), ts
+
+
+class SyntheticSource(FrameSource):
+    """Fuente sintética: desplaza una imagen base (o ruido) de un lado a otro."""
+
+    def __init__(self, n_frames=300, fps=30.0, shape=(480, 640, 3), image=None, seed=0,
+                 realtime=False):
+        super().__init__(realtime)
+        rng = np.random.default_rng(seed)
+        if image is None:
+            image = rng.integers(0, 255, size=shape, dtype=np.uint8)
+        self.base = image
+        self.shape = image.shape
+        self.n_frames = n_frames
+        self.fps = fps
+        self.index = 0
+
+    def _next_frame(self, image):
+        if self.index >= self.n_frames:
+            return None
+        shift = int(40 * np.sin(self.index / self.fps))
+        frame = np.roll(self.base, shift, axis=1)
+        ts = self.index / self.fps
+        self.index += 1
+        return self._into(image, frame), ts
+
+
+def open_source(spec, realtime=False, fps=30.0):
+    """
+    Crea una fuente a partir de un texto:
+    - entero ("0", "1"): cámara con ese índice;
+    - "synthetic" o "synthetic:N": N frames sintéticos;
+    - directorio o patrón con comodines: secuencia de imágenes;
+    - cualquier otro archivo: video.
+    """
+    if isinstance(spec, int) or str(spec).isdigit():
+        return CameraSource(int(spec))
+    spec = str(spec)
+    if spec.startswith("synthetic"):
+        _, _, n = spec.partition(":")
+        return SyntheticSource(int(n) if n else 300, fps=fps, realtime=realtime)
+    if os.path.isdir(spec) or any(ch in spec for ch in "*?["):
+        return ImageSequenceSource(spec, fps=fps, realtime=realtime)
+    return VideoFileSource(spec, realtime=realtime)
@@ -0,0 +1,70 @@
+import time
+from collections import deque
+
+
+class InputEventQueue:
+    """
+    Cola acotada de eventos de entrada (timestamp, tipo) escrita desde los
+    hilos de los listeners de pynput y drenada por lotes en check_window.
+    - record(): un solo deque.append (atómico bajo el GIL), sin locks; es lo
+      único que se hace dentro de los callbacks.
+    - drain(): saca todos los eventos pendientes en orden de llegada.
+    Si nadie drena, se descartan los más viejos (maxlen).
+    Los timestamps usan time.time(), el mismo reloj que los cambios de foco.
+    """
+
+    max_events = 4096
+
+    def __init__(self, maxlen=None):
+        self._events = deque(maxlen=maxlen or self.max_events)
+
+    def record(self, kind, timestamp=None):
+        self._events.append((time.time() if timestamp is None else timestamp, kind))
+
+    def drain(self):
+        events = self._events
+        batch = []
+        while events:
+            batch.append(events.popleft())
+        return batch
+
+    def clear(self):
+        self._events.clear()
+
+    def __len__(self):
+        return len(self._events)
+
+
+class InputHistory:
+    """
+    Historial compacto de entradas ya drenadas para atribuir cambios de foco.
+    Solo guarda el inicio de cada racha del mismo tipo: para saber cuál fue
+    la última entrada antes de un instante alcanza con eso, y el tamaño
+    depende de cuántas veces se alterna mouse/teclado, no de la tasa de eventos.
+    """
+
+    def __init__(self, maxlen=InputEventQueue.max_events):
+        self._runs = deque(maxlen=maxlen)
+        self.last_kind = None
+
+    def extend(self, events):
+        runs = self._runs
+        for ts, kind in events:
+            last = runs[-1][1] if runs else self.last_kind
+            if kind != last:
+                runs.append((ts, kind))
+
+    def kind_at(self, ts):
+        """
+        Tipo de la última entrada ocurrida hasta `ts` (None si no hubo).
+        Consume el historial hasta ese instante: las consultas deben hacerse
+        en orden creciente de tiempo.
+        """
+        runs = self._runs
+        while runs and runs[0][0] <= ts:
+            self.last_kind = runs.popleft()[1]
+        return self.last_kind
+
+    def clear(self):
+        self._runs.clear()
+        self.last_kind = None
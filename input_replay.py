@@ -0,0 +1,299 @@
+"""
+Banco de pruebas de EventMonitor con entradas sintéticas (sin mouse,
+teclado ni display).
+
+Genera flujos de teclado/mouse a alta tasa con salidas de la ventana del
+examen provocadas por una entrada conocida, los inyecta en la
+InputEventQueue y en un FakeFocusBackend, y llama a check_window a ritmo de
+frames. Mide:
+- el costo de los callbacks de pynput (_on_key/_on_mouse_click) llamados
+  desde varios hilos a la vez;
+- la precisión de la atribución de causas (mouse/teclado) y del tiempo
+  fuera, comparada con la atribución anterior por frame (último tipo de
+  entrada visto al momento de llamar check_window).
+Con --check verifica además que SessionEngine reparta el tiempo fuera de la
+ventana según los timestamps de los cambios (incluido un tramo abierto al
+detener) y sale con código 1 si no coincide.
+
+Uso:
+    python input_replay.py --input-rate 500 --switches 200
+    python input_replay.py --check
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+from event_monitor import EventMonitor
+from focus_backends import FakeFocusBackend
+from frame_sources import SyntheticSource
+
+EXAM_TITLE = "Monitoreo de Examen"
+OTHER_TITLE = "Otra ventana"
+KINDS = ("mouse", "keyboard")
+
+
+def make_scenario(duration=60.0, input_rate=300.0, switches=50, mouse_share=0.5,
+                  latency=(0.002, 0.040), away=(0.2, 3.0), seed=0, start=1_000_000.0):
+    """
+    Escenario sintético reproducible.
+    - input_rate: entradas por segundo (Poisson, tipos mezclados).
+    - switches: cantidad de salidas de la ventana del examen; cada una la
+      provoca una entrada de tipo conocido `latency` segundos antes, sin
+      otras entradas en el medio.
+    - away: rango (s) del tiempo fuera antes de volver.
+    Devuelve dict con inputs [(ts, tipo)], focus [(ts, título)] y la verdad:
+    causa de cada salida y tiempo fuera por causa.
+    """
+    rng = np.random.default_rng(seed)
+    n_inputs = rng.poisson(input_rate * duration)
+    input_ts = np.sort(rng.uniform(0.0, duration, n_inputs))
+    input_kind = rng.random(n_inputs) < mouse_share  #True = mouse
+
+    #Salidas en tramos disjuntos: [trigger, salida, regreso]
+    slot = duration / max(switches, 1)
+    keep = np.ones(n_inputs, dtype=bool)
+    triggers, focus, causes = [], [], []
+    out_time = {kind: 0.0 for kind in KINDS}
+    for i in range(switches):
+        lo = i * slot
+        t_away = min(rng.uniform(*away), slot * 0.5)
+        t_lat = rng.uniform(*latency)
+        t_out = rng.uniform(lo + t_lat, lo + slot - t_away)
+        t_trigger = t_out - t_lat
+        cause = KINDS[0] if rng.random() < mouse_share else KINDS[1]
+
+        #La entrada que provoca la salida es la última antes del cambio
+        keep &= ~((input_ts >= t_trigger) & (input_ts <= t_out))
+        triggers.append((t_trigger, cause))
+        focus.append((t_out, OTHER_TITLE))
+        focus.append((t_out + t_away, EXAM_TITLE))
+        causes.append(cause)
+        out_time[cause] += t_away
+
+    inputs = [(start + t, KINDS[0] if m else KINDS[1])
+              for t, m in zip(input_ts[keep], input_kind[keep])]
+    inputs += [(start + t, kind) for t, kind in triggers]
+    inputs.sort()
+    return {
+        "start": start,
+        "duration": duration,
+        "inputs": inputs,
+        "focus": [(start + t, title) for t, title in focus],
+        "causes": causes,
+        "out_time": out_time,
+    }
+
+
+def replay(scenario, frame_interval=1.0 / 30.0):
+    """
+    Reproduce un escenario en simulación (sin esperas reales).
+    En cada frame se inyectan las entradas y cambios de foco ocurridos hasta
+    ese instante y se llama a check_window.
+    Devuelve el monitor y las causas asignadas por salida (nueva y anterior).
+    """
+    t = scenario["start"]
+    focus = FakeFocusBackend(EXAM_TITLE)
+    #Reloj simulado: el tramo abierto se mide hasta el frame actual
+    monitor = EventMonitor(focus_backend=focus, listen_inputs=False, clock=lambda: t)
+    monitor.exam_window_title = EXAM_TITLE
+
+    inputs = scenario["inputs"]
+    changes = scenario["focus"]
+    i_in = i_fc = 0
+    legacy_kind = "unknown"
+    legacy_causes = []
+    new_causes = []
+    last_counts = (0, 0)
+
+    end = t + scenario["duration"] + frame_interval
+    while t <= end:
+        while i_in < len(inputs) and inputs[i_in][0] <= t:
+            ts, kind = inputs[i_in]
+            monitor.input_events.record(kind, ts)
+            legacy_kind = kind
+            i_in += 1
+        while i_fc < len(changes) and changes[i_fc][0] <= t:
+            ts, title = changes[i_fc]
+            focus.set_focus(title, ts)
+            if title == OTHER_TITLE:
+                #Antes: el tipo de la última entrada vista al revisar el frame
+                legacy_causes.append(legacy_kind)
+            i_fc += 1
+
+        monitor.check_window()
+        #Causa de cada salida nueva según qué contador subió
+        stats = monitor.get_stats()
+        counts = (stats["mouse_changes"], stats["keyboard_changes"])
+        for kind, now_count, before in zip(KINDS, counts, last_counts):
+            new_causes.extend([kind] * (now_count - before))
+        last_counts = counts
+        t += frame_interval
+
+    return monitor, new_causes, legacy_causes
+
+
+def check_out_time(fps=10.0, tolerance=1e-6):
+    """
+    Sesión corta con SessionEngine, FakeFocusBackend y entradas inyectadas
+    (timestamps en el reloj de una SyntheticSource):
+    - mouse en 1.02 s, sale en 1.04 s, vuelve en 2.51 s (1.47 s por mouse);
+    - teclado en 3.00 s, sale en 3.05 s y sigue fuera al detener en 4.0 s
+      (0.95 s por teclado, tramo abierto).
+    Los tiempos fuera no dependen de los frames. Devuelve
+    {nombre: (medido, esperado)} y la lista de los que no coinciden.
+    """
+    from face_detection_module import FaceDetectionModule
+    from session_engine import SessionEngine
+
+    source = SyntheticSource(n_frames=int(4.0 * fps) + 1, fps=fps, shape=(120, 160, 3))
+    focus = FakeFocusBackend(EXAM_TITLE)
+    monitor = EventMonitor(focus_backend=focus, listen_inputs=False, clock=source.clock)
+    engine = SessionEngine(source, FaceDetectionModule(), monitor)
+    events = [
+        (1.02, lambda: monitor.input_events.record("mouse", 1.02)),
+        (1.04, lambda: focus.set_focus(OTHER_TITLE, 1.04)),
+        (2.51, lambda: focus.set_focus(EXAM_TITLE, 2.51)),
+        (3.00, lambda: monitor.input_events.record("keyboard", 3.00)),
+        (3.05, lambda: focus.set_focus(OTHER_TITLE, 3.05)),
+    ]
+
+    engine.start_exam()
+    while True:
+        next_ts = source.index / fps
+        while events and events[0][0] <= next_ts:
+            events.pop(0)[1]()
+        ret, _ = engine.step()
+        if not ret:
+            break
+    open_stats = monitor.get_stats()
+    results = engine.stop_exam()
+    final = results["event_stats"]
+
+    checks = {
+        "total_exam_time": (results["total_exam_time"], 4.0),
+        "mouse_window_time": (results["mouse_window_time"], 1.47),
+        "keyboard_window_time": (results["keyboard_window_time"], 0.95),
+        "open_keyboard_out_time": (open_stats["keyboard_out_time"], 0.95),
+        "mouse_out_time": (final["mouse_out_time"], 1.47),
+        "keyboard_out_time": (final["keyboard_out_time"], 0.95),
+        "mouse_changes": (final["mouse_changes"], 1),
+        "keyboard_changes": (final["keyboard_changes"], 1),
+    }
+    failed = [name for name, (got, want) in checks.items() if abs(got - want) > tolerance]
+    #La no atención incluye al menos todo el tiempo fuera
+    if results["no_attention_time"] < 1.47 + 0.95 - tolerance:
+        failed.append("no_attention_time")
+    return checks, failed
+
+
+def _accuracy(assigned, truth):
+    if not truth:
+        return 1.0
+    hits = sum(a == b for a, b in zip(assigned, truth))
+    return hits / len(truth)
+
+
+def measure_callback_overhead(n_events=200_000, threads=2):
+    """
+    Llama a los callbacks reales desde `threads` hilos a la vez (como los
+    listeners de mouse y teclado). Devuelve ns por llamada y eventos/s.
+    """
+    monitor = EventMonitor(focus_backend=FakeFocusBackend(EXAM_TITLE))
+    per_thread = n_events // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        call = (lambda: monitor._on_mouse_click(0, 0, None, True)) if index % 2 else \
+            (lambda: monitor._on_key(None))
+        barrier.wait()
+        for _ in range(per_thread):
+            call()
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    total = per_thread * threads
+    t0 = time.perf_counter()
+    drained = len(monitor.input_events.drain())
+    drain_elapsed = time.perf_counter() - t0
+    return {
+        "events": total,
+        "callback_ns": elapsed / total * 1e9,
+        "events_per_s": total / elapsed if elapsed > 0 else 0.0,
+        "drained": drained,
+        "drain_ns_per_event": drain_elapsed / drained * 1e9 if drained else 0.0,
+    }
+
+
+def run(duration, input_rate, switches, fps, seed):
+    scenario = make_scenario(duration, input_rate, switches, seed=seed)
+    start = time.perf_counter()
+    monitor, new_causes, legacy_causes = replay(scenario, 1.0 / fps)
+    elapsed = time.perf_counter() - start
+
+    stats = monitor.get_stats()
+    truth = scenario["out_time"]
+    return {
+        "inputs": len(scenario["inputs"]),
+        "switches": len(scenario["causes"]),
+        "replay_s": elapsed,
+        "accuracy": _accuracy(new_causes, scenario["causes"]),
+        "legacy_accuracy": _accuracy(legacy_causes, scenario["causes"]),
+        "out_time_error_s": {
+            "mouse": stats["mouse_out_time"] - truth["mouse"],
+            "keyboard": stats["keyboard_out_time"] - truth["keyboard"],
+        },
+        "callbacks": measure_callback_overhead(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EventMonitor con entradas sintéticas.")
+    parser.add_argument("--duration", type=float, default=300.0, help="Segundos simulados")
+    parser.add_argument("--input-rate", type=float, default=300.0, help="Entradas por segundo")
+    parser.add_argument("--switches", type=int, default=100, help="Salidas de la ventana del examen")
+    parser.add_argument("--fps", type=float, default=30.0, help="Frecuencia de check_window")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Archivo JSON de salida")
+    parser.add_argument("--check", action="store_true",
+                        help="Verifica los tiempos fuera de SessionEngine y termina")
+    args = parser.parse_args()
+
+    if args.check:
+        checks, failed = check_out_time()
+        for name, (got, want) in checks.items():
+            mark = "ERROR" if name in failed else "ok"
+            print(f"[check] {name:<24} {got:8.3f} (esperado {want:.3f}) {mark}")
+        if failed:
+            sys.exit(1)
+        return
+
+    results = run(args.duration, args.input_rate, args.switches, args.fps, args.seed)
+    cb = results["callbacks"]
+    print(f"[replay] {results['inputs']} entradas, {results['switches']} salidas "
+          f"en {results['replay_s']:.2f}s", file=sys.stderr)
+    print(f"[replay] atribución: {results['accuracy'] * 100:.1f}% "
+          f"(por frame: {results['legacy_accuracy'] * 100:.1f}%)", file=sys.stderr)
+    print(f"[replay] callbacks: {cb['callback_ns']:.0f} ns/evento, "
+          f"drenado {cb['drain_ns_per_event']:.0f} ns/evento", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
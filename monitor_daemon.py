@@ -0,0 +1,342 @@
+"""
+Monitor sin interfaz (kiosco / laboratorio).
+
+Corre el mismo SessionEngine que ProctoringApp pero sin Tk, sin vista
+previa y sin dibujar sobre los frames (annotate=False): solo lee la fuente,
+detecta y lleva los tiempos. Con el examen detenido no lee frames.
+Al detener el examen escribe los resultados en --output (.json con el
+formato de get_results, que también lee cohort_report, y .txt con el
+resumen de exam_summary).
+
+Control:
+- Señales (POSIX): SIGUSR1 inicia el examen, SIGUSR2 lo detiene y escribe
+  los resultados, SIGTERM / SIGINT lo detienen, escriben y salen.
+- --control RUTA (socket Unix) o --control host:puerto (TCP, solo en una
+  dirección loopback: las órdenes no llevan autenticación): una orden por
+  línea ("start", "stop", "status", "results", "quit"); cada respuesta es
+  una línea JSON.
+
+Uso:
+    python monitor_daemon.py --output resultados/{start}.json --control /tmp/monitor.sock
+    echo start | nc -U /tmp/monitor.sock
+"""
+import argparse
+import collections
+import ipaddress
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import threading
+import time
+
+from exam_summary import build_summary
+from frame_scheduler import AdaptiveScheduler
+from frame_sources import open_source
+from session_engine import SessionEngine
+
+COMMANDS = ("start", "stop", "status", "results", "quit")
+#Espera máxima entre revisiones de señales (s)
+IDLE_WAIT = 0.25
+
+
+class MonitorDaemon:
+    """
+    Bucle de monitoreo sin interfaz sobre un SessionEngine.
+    - Las órdenes (señales, socket, autostart) se encolan y las ejecuta el
+      bucle principal, así el motor se usa desde un solo hilo.
+    - max_fps limita la frecuencia de análisis con fuentes en vivo (las
+      grabadas a ritmo real ya se pacen solas); con scheduler la decide un
+      AdaptiveScheduler según el costo medido.
+    - output_path: "{start}" se reemplaza por la hora de inicio del examen.
+    - exit_on_end: al terminar una grabación detiene, escribe y sale.
+    """
+
+    def __init__(self, engine, output_path, max_fps=10.0, scheduler=None, exit_on_end=True):
+        self.engine = engine
+        self.output_path = output_path
+        self.max_fps = max_fps
+        self.scheduler = scheduler
+        self.exit_on_end = exit_on_end
+        self.last_output = None
+        self._commands = queue.Queue()
+        #Las señales no pueden tomar locks (el bucle puede tenerlos): van aparte
+        self._signals = collections.deque()
+        self._running = False
+
+    #-----------Órdenes-----------
+
+    def request(self, command, wait=None):
+        """
+        Encola una orden. Con wait (s) espera la respuesta del bucle y la
+        devuelve (dict); sin wait devuelve None enseguida.
+        """
+        if command not in COMMANDS:
+            return {"ok": False, "error": f"orden desconocida: {command}"}
+        reply = queue.Queue(maxsize=1) if wait else None
+        self._commands.put((command, reply))
+        if reply is None:
+            return None
+        try:
+            return reply.get(timeout=wait)
+        except queue.Empty:
+            return {"ok": False, "error": "sin respuesta"}
+
+    def _execute(self, command):
+        engine = self.engine
+        if command == "start":
+            if not engine.is_exam_running:
+                engine.start_exam()
+                print("[Daemon] Examen iniciado")
+            return {"ok": True, **self.status()}
+        if command in ("stop", "quit"):
+            if engine.is_exam_running:
+                self.write_results(engine.stop_exam())
+                print("[Daemon] Examen detenido:", self.last_output)
+            if command == "quit":
+                self._running = False
+            return {"ok": True, **self.status()}
+        if command == "status":
+            return {"ok": True, **self.status()}
+        return {"ok": True, "results": engine.get_results()}
+
+    def _run_command(self, command, reply=None):
+        try:
+            response = self._execute(command)
+        except Exception as exc:
+            #p. ej. sin display para los listeners de EventMonitor
+            print(f"[Daemon] Error en '{command}': {exc}")
+            response = {"ok": False, "error": str(exc)}
+        if reply is not None:
+            reply.put(response)
+
+    def _process_commands(self, timeout):
+        """
+        Espera órdenes hasta `timeout` s (0 = solo revisa) y vuelve apenas
+        ejecuta alguna, para que el bucle reaccione enseguida.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            if self._signals:
+                self._run_command(self._signals.popleft())
+                return
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self._commands.get(timeout=min(remaining, IDLE_WAIT))
+                else:
+                    item = self._commands.get_nowait()
+            except queue.Empty:
+                if remaining <= 0:
+                    return
+                continue
+            self._run_command(*item)
+            return
+
+    def status(self):
+        engine = self.engine
+        return {
+            "running": engine.is_exam_running,
+            "exam_time": engine.total_exam_time,
+            "frames": engine.frames_analyzed,
+            "output": self.last_output,
+        }
+
+    #-----------Resultados-----------
+
+    def write_results(self, results):
+        """Escribe .json y .txt junto a output_path; devuelve la ruta del .json."""
+        path = self.output_path.format(start=int(self.engine.exam_start_time or time.time()))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        summary_text = build_summary(results) or "No se registraron datos suficientes."
+        with open(os.path.splitext(path)[0] + ".txt", "w", encoding="utf-8") as f:
+            f.write(summary_text + "\n")
+        self.last_output = path
+        return path
+
+    #-----------Bucle principal-----------
+
+    def run(self):
+        engine = self.engine
+        cap = engine.cap
+        self._running = True
+        while self._running:
+            if not engine.is_exam_running:
+                #Examen detenido: no se lee ni se analiza nada
+                self._process_commands(IDLE_WAIT)
+                continue
+
+            frame_start = time.perf_counter()
+            ret, _ = engine.step()
+            cost = time.perf_counter() - frame_start
+            if not ret:
+                if cap.live:
+                    print("[Daemon] No se pudo leer de la cámara.")
+                    self._process_commands(IDLE_WAIT)
+                    continue
+                print("[Daemon] Fin de la grabación.")
+                self._execute("quit" if self.exit_on_end else "stop")
+                continue
+
+            delay = 0.0
+            if cap.live:
+                if self.scheduler is not None:
+                    delay = self.scheduler.next_delay(cost)
+                elif self.max_fps:
+                    delay = max(0.0, 1.0 / self.max_fps - cost)
+            self._process_commands(delay)
+
+        engine.close()
+
+    def install_signal_handlers(self):
+        """SIGUSR1 = start, SIGUSR2 = stop, SIGTERM / SIGINT = quit (si existen)."""
+        handlers = {"SIGUSR1": "start", "SIGUSR2": "stop", "SIGTERM": "quit", "SIGINT": "quit"}
+        for name, command in handlers.items():
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                signal.signal(signum, lambda *_, command=command: self._signals.append(command))
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            command = line.decode("utf-8", "replace").strip().lower()
+            if not command:
+                continue
+            response = self.server.daemon.request(command, wait=5.0)
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            if command == "quit":
+                return
+
+
+def _is_loopback(host):
+    """True si todas las direcciones de `host` son loopback."""
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except socket.gaierror:
+        return False
+    return all(ipaddress.ip_address(info[4][0]).is_loopback for info in infos)
+
+
+def start_control_server(daemon, address):
+    """
+    Servidor de órdenes en un hilo aparte.
+    - address: "host:puerto" (TCP) o ruta de un socket Unix.
+    Las órdenes no llevan autenticación: en TCP solo se aceptan hosts
+    loopback (ValueError si no).
+    """
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        if not _is_loopback(host):
+            raise ValueError(f"el control TCP solo escucha en loopback, no en {host}")
+        server = socketserver.ThreadingTCPServer((host, int(port)), _ControlHandler)
+    else:
+        if os.path.exists(address):
+            os.unlink(address)
+        server = socketserver.ThreadingUnixStreamServer(address, _ControlHandler)
+    server.daemon_threads = True
+    server.daemon = daemon
+    threading.Thread(target=server.serve_forever, name="daemon-control", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor de examen sin interfaz.")
+    parser.add_argument("--source", default="0",
+                        help="Índice de cámara, video, secuencia de imágenes o synthetic:N")
+    parser.add_argument("--realtime", action="store_true",
+                        help="Reproduce las grabaciones a ritmo real")
+    parser.add_argument("--output", default="resultados_{start}.json",
+                        help="JSON de resultados ({start} = hora de inicio); también se escribe un .txt")
+    parser.add_argument("--control", default=None,
+                        help="Socket de control: ruta de socket Unix o host:puerto (solo loopback)")
+    parser.add_argument("--start", action="store_true", help="Inicia el examen al arrancar")
+    parser.add_argument("--max-fps", type=float, default=10.0, help="Frecuencia máxima de análisis en vivo")
+    parser.add_argument("--cpu-budget", type=float, default=None,
+                        help="Fracción de CPU para el análisis (activa el planificador adaptativo)")
+    parser.add_argument("--no-window-monitor", action="store_true",
+                        help="No monitorea cambios de ventana (solo giros de cabeza)")
+    parser.add_argument("--timeline", default=None, help="Línea de tiempo por frame ({start} = hora de inicio)")
+    parser.add_argument("--tracking", action="store_true", help="Activa el modo tracking por ROI")
+    parser.add_argument("--detection-width", default="fast",
+                        help="Ancho de detección en px o preset (precision/balanced/fast)")
+    parser.add_argument("--motion-threshold", type=float, default=None,
+                        help="Reutiliza la última detección si el frame cambió menos que esto (niveles de gris)")
+    parser.add_argument("--stats-server", default=None, help="Servicio del aula (host:puerto)")
+    parser.add_argument("--student-id", default=None, help="Identificador del alumno (por defecto, el equipo)")
+    args = parser.parse_args()
+
+    from face_detection_module import FaceDetectionModule
+
+    detection_width = args.detection_width
+    if detection_width is not None and detection_width.isdigit():
+        detection_width = int(detection_width)
+    detector = FaceDetectionModule(
+        tracking=args.tracking,
+        detection_width=detection_width,
+        motion_threshold=args.motion_threshold,
+        reuse_buffers=True,
+        annotate=False,
+    )
+    event_monitor = None
+    if not args.no_window_monitor:
+        from event_monitor import EventMonitor
+        event_monitor = EventMonitor()
+
+    cap = open_source(args.source, realtime=args.realtime)
+    if not cap.isOpened():
+        cap.release()
+        parser.error("No se pudo abrir la cámara.")
+
+    scheduler = None
+    if args.cpu_budget is not None:
+        scheduler = AdaptiveScheduler(cpu_budget=args.cpu_budget, target_fps=args.max_fps)
+    engine = SessionEngine(
+        cap, detector, event_monitor,
+        scheduler=scheduler, timeline_path=args.timeline, reuse_buffers=True,
+    )
+    daemon = MonitorDaemon(engine, args.output, max_fps=args.max_fps, scheduler=scheduler)
+    daemon.install_signal_handlers()
+
+    control = None
+    if args.control:
+        try:
+            control = start_control_server(daemon, args.control)
+        except ValueError as exc:
+            engine.close()
+            parser.error(str(exc))
+        print("[Daemon] Control en", args.control)
+
+    stats_client = None
+    if args.stats_server:
+        from stats_client import StatsClient
+        host, port = args.stats_server.rsplit(":", 1)
+        stats_client = StatsClient(
+            host, int(port), args.student_id or socket.gethostname(),
+            engine.get_results, running_fn=lambda: engine.is_exam_running,
+        )
+        stats_client.start()
+
+    if args.start:
+        daemon.request("start")
+    print(f"[Daemon] Listo (pid {os.getpid()})")
+    try:
+        daemon.run()
+    finally:
+        if stats_client is not None:
+            stats_client.stop()
+        if control is not None:
+            control.shutdown()
+            control.server_close()
+            if isinstance(control.server_address, str):
+                os.unlink(control.server_address)
+
+
+if __name__ == "__main__":
+    main()
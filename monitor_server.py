@@ -0,0 +1,305 @@
+"""
+Servidor de monitoreo para muchos alumnos a la vez.
+
+Cada stream (cámara, video o fuente sintética) tiene su propio estado de
+detección (calibración, stats, last_direction) dentro de un proceso worker.
+Los frames viajan por memoria compartida: la fuente (frame_sources) escribe
+cada frame directamente en un slot de un buffer compartido y solo se envía
+al worker el índice del slot y el timestamp, sin serializar la imagen.
+
+Uso local:
+    python monitor_server.py --synthetic 8 --frames 300 --workers 4
+    python monitor_server.py --videos a.avi b.avi
+"""
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from face_detection_module import FaceDetectionModule
+from frame_sources import SyntheticSource, VideoFileSource
+from session_engine import SessionEngine
+
+#Slots por stream: permite que el productor escriba mientras el worker analiza
+SLOTS_PER_STREAM = 2
+#Espera máxima (s) por un resultado antes de revisar si los workers siguen vivos
+RESULT_TIMEOUT = 0.5
+#Espera máxima (s) a que termine cada worker al cerrar
+JOIN_TIMEOUT = 5.0
+
+
+class _StreamState:
+    """
+    Estado de un stream dentro del worker: un SessionEngine propio (sin
+    fuente ni monitor de ventanas) con examen iniciado; los frames llegan
+    del buffer compartido con su timestamp.
+    """
+
+    def __init__(self, detector_options):
+        self.engine = SessionEngine(None, FaceDetectionModule(**(detector_options or {})))
+        self.engine.start_exam()
+
+    def process(self, frame, ts):
+        #El espejo del motor copia el frame fuera del slot compartido
+        self.engine.analyze_frame(frame, ts)
+        return self.engine.last_direction
+
+    def get_results(self):
+        return {
+            "frames": self.engine.frames_analyzed,
+            **self.engine.stop_exam(),
+            "last_direction": self.engine.face_detector.last_direction,
+        }
+
+
+def _worker_main(task_queue, result_queue, shm_specs, detector_options):
+    """
+    Proceso worker. Atiende los streams que le fueron asignados.
+    - shm_specs: {stream_id: (nombre_shm, shape)} de sus streams.
+    """
+    cv2.setNumThreads(1)
+    buffers = {}
+    states = {}
+    for stream_id, (shm_name, shape) in shm_specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        slots = np.ndarray((SLOTS_PER_STREAM,) + tuple(shape), dtype=np.uint8, buffer=shm.buf)
+        buffers[stream_id] = (shm, slots)
+        states[stream_id] = _StreamState(detector_options)
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        stream_id, slot, ts = task
+        direction = states[stream_id].process(buffers[stream_id][1][slot], ts)
+        result_queue.put(("frame", stream_id, slot, direction))
+
+    for stream_id, state in states.items():
+        result_queue.put(("final", stream_id, state.get_results(), None))
+
+    del states
+    for shm, slots in buffers.values():
+        del slots
+        shm.close()
+
+
+class MonitorServer:
+    """
+    Reparte N streams entre un pool de procesos worker.
+    Cada stream se asigna siempre al mismo worker para que su estado
+    (calibración, stats) viva en un único proceso.
+    Si un worker muere (p. ej. el detector no se pudo crear), sus streams
+    se dejan de despachar y el reporte los marca con "error"; el resto
+    sigue.
+    """
+
+    def __init__(self, workers=None, detector_options=None):
+        self.n_workers = workers or os.cpu_count()
+        self.detector_options = detector_options
+        self.sources = []
+
+    def add_stream(self, source):
+        self.sources.append(source)
+        return len(self.sources) - 1
+
+    def run(self):
+        """Procesa todos los streams hasta agotarlos; devuelve el reporte."""
+        ctx = mp.get_context("spawn")
+        n_streams = len(self.sources)
+        n_workers = max(1, min(self.n_workers, n_streams))
+
+        #Un buffer compartido por stream con SLOTS_PER_STREAM frames
+        shms = []
+        slot_views = []
+        for source in self.sources:
+            size = SLOTS_PER_STREAM * int(np.prod(source.shape))
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            shms.append(shm)
+            slot_views.append(
+                np.ndarray((SLOTS_PER_STREAM,) + tuple(source.shape), dtype=np.uint8, buffer=shm.buf)
+            )
+
+        result_queue = ctx.Queue()
+        task_queues = []
+        processes = []
+        for w in range(n_workers):
+            specs = {
+                sid: (shms[sid].name, self.sources[sid].shape)
+                for sid in range(n_streams)
+                if sid % n_workers == w
+            }
+            tq = ctx.Queue()
+            proc = ctx.Process(
+                target=_worker_main,
+                args=(tq, result_queue, specs, self.detector_options),
+                daemon=True,
+            )
+            proc.start()
+            task_queues.append(tq)
+            processes.append(proc)
+
+        free_slots = [list(range(SLOTS_PER_STREAM)) for _ in range(n_streams)]
+        exhausted = [False] * n_streams
+        in_flight = 0
+        pending = [0] * n_streams  #frames en vuelo por stream
+        errors = {}  #stream -> motivo, si su worker murió
+        finals = {}
+        frame_counts = [0] * n_streams
+        first_done = [None] * n_streams
+        last_done = [None] * n_streams
+
+        def handle(msg):
+            nonlocal in_flight
+            kind, sid, payload, _ = msg
+            if kind == "frame":
+                free_slots[sid].append(payload)
+                in_flight -= 1
+                pending[sid] -= 1
+                now = time.perf_counter()
+                if first_done[sid] is None:
+                    first_done[sid] = now
+                last_done[sid] = now
+                frame_counts[sid] += 1
+            else:
+                finals[sid] = payload
+
+        def drain():
+            while True:
+                try:
+                    handle(result_queue.get_nowait())
+                except queue.Empty:
+                    return
+
+        def check_workers():
+            """Da por perdidos los streams de los workers que murieron."""
+            nonlocal in_flight
+            for w, proc in enumerate(processes):
+                if proc.is_alive():
+                    continue
+                #Lo que alcanzó a publicar antes de morir
+                drain()
+                for sid in range(w, n_streams, n_workers):
+                    if sid in finals or sid in errors:
+                        continue
+                    errors[sid] = f"el worker {w} terminó (código {proc.exitcode})"
+                    print(f"[server] stream {sid}: {errors[sid]}")
+                    exhausted[sid] = True
+                    in_flight -= pending[sid]
+                    pending[sid] = 0
+
+        start = time.perf_counter()
+        try:
+            while not all(exhausted) or in_flight > 0:
+                dispatched = False
+                for sid, source in enumerate(self.sources):
+                    if exhausted[sid] or not free_slots[sid]:
+                        continue
+                    #La fuente escribe directamente en el slot compartido
+                    slot = free_slots[sid][-1]
+                    #Cada indexado crea una vista nueva: se toma una sola vez
+                    dst = slot_views[sid][slot]
+                    ret, frame = source.read(dst)
+                    if not ret:
+                        exhausted[sid] = True
+                        continue
+                    if frame is not dst:
+                        dst[...] = frame
+                    free_slots[sid].pop()
+                    task_queues[sid % n_workers].put((sid, slot, source.last_timestamp))
+                    in_flight += 1
+                    pending[sid] += 1
+                    dispatched = True
+
+                #Si no hubo nada que despachar, esperamos un resultado
+                try:
+                    handle(result_queue.get(timeout=RESULT_TIMEOUT if not dispatched and in_flight else 0))
+                except queue.Empty:
+                    if not dispatched:
+                        check_workers()
+                drain()
+
+            elapsed = time.perf_counter() - start
+            for tq in task_queues:
+                tq.put(None)
+            while len(finals) + len(errors) < n_streams:
+                try:
+                    handle(result_queue.get(timeout=RESULT_TIMEOUT))
+                except queue.Empty:
+                    check_workers()
+            for proc in processes:
+                proc.join(JOIN_TIMEOUT)
+        finally:
+            for proc in processes:
+                if proc.is_alive():
+                    proc.terminate()
+            for source in self.sources:
+                source.release()
+            del slot_views
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+        streams = []
+        for sid in range(n_streams):
+            results = finals.get(sid, {})
+            if sid in errors:
+                results["error"] = errors[sid]
+            results["stream"] = sid
+            #Ritmo propio del stream: entre su primer y su último frame terminado
+            span = last_done[sid] - first_done[sid] if frame_counts[sid] > 1 else 0.0
+            results["fps"] = (frame_counts[sid] - 1) / span if span > 0 else 0.0
+            streams.append(results)
+        total_frames = sum(frame_counts)
+        return {
+            "workers": n_workers,
+            "elapsed": elapsed,
+            "total_frames": total_frames,
+            "total_fps": total_frames / elapsed if elapsed > 0 else 0.0,
+            "streams": streams,
+            "failed": len(errors),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de monitoreo multi-alumno.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Cantidad de streams sintéticos")
+    parser.add_argument("--frames", type=int, default=300, help="Frames por stream sintético")
+    parser.add_argument("--image", default=None, help="Imagen base para los streams sintéticos")
+    parser.add_argument("--videos", nargs="*", default=[], help="Videos a usar como streams")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--tracking", action="store_true", help="Activa el modo tracking por ROI")
+    args = parser.parse_args()
+
+    server = MonitorServer(args.workers, {"tracking": args.tracking})
+    image = cv2.imread(args.image) if args.image else None
+    for i in range(args.synthetic):
+        server.add_stream(SyntheticSource(args.frames, image=image, seed=i))
+    for path in args.videos:
+        server.add_stream(VideoFileSource(path))
+    if not server.sources:
+        parser.error("Indique --synthetic N o --videos ...")
+
+    report = server.run()
+    for stream in report["streams"]:
+        if "error" in stream:
+            print(f"[server] stream {stream['stream']}: ERROR {stream['error']}")
+            continue
+        print(
+            f"[server] stream {stream['stream']}: {stream['frames']} frames, "
+            f"{stream['fps']:.1f} fps, atención {stream['attention_time']:.1f}s / "
+            f"{stream['total_exam_time']:.1f}s"
+        )
+    print(
+        f"[server] {len(report['streams'])} streams, {report['workers']} workers: "
+        f"{report['total_frames']} frames en {report['elapsed']:.1f}s "
+        f"({report['total_fps']:.1f} fps total)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+
+class PerfMonitor:
+    """
+    Instrumentación liviana por etapa.
+    - lap(stage, t0): registra la duración desde t0 en un buffer circular
+      por etapa y devuelve el instante actual (para encadenar etapas).
+    - frame(): marca el fin de un frame; calcula FPS efectivo y frames tarde
+      (intervalo mayor a `late_factor` veces el intervalo esperado).
+    - count(name): contadores (p. ej. frames descartados).
+    Quien la usa guarda `perf = None` cuando está desactivada y solo hace
+    `if perf:`, así el costo sin instrumentación es una comparación.
+    """
+
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self, window=300, expected_interval=0.02, late_factor=2.0):
+        self.window = window
+        self.expected_interval = expected_interval
+        self.late_factor = late_factor
+        self.reset()
+
+    def reset(self):
+        self.samples = {}
+        self.counters = {"frames": 0, "late": 0, "dropped": 0}
+        self.frame_intervals = deque(maxlen=self.window)
+        self._last_frame = None
+        self.started_at = time.time()
+
+    #Registro
+    def lap(self, stage, t0):
+        now = time.perf_counter()
+        buf = self.samples.get(stage)
+        if buf is None:
+            buf = self.samples[stage] = deque(maxlen=self.window)
+        buf.append(now - t0)
+        return now
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def frame(self):
+        now = time.perf_counter()
+        if self._last_frame is not None:
+            interval = now - self._last_frame
+            self.frame_intervals.append(interval)
+            if interval > self.expected_interval * self.late_factor:
+                self.counters["late"] += 1
+        self._last_frame = now
+        self.counters["frames"] += 1
+
+    #Lectura
+    def fps(self):
+        if not self.frame_intervals:
+            return 0.0
+        mean = sum(self.frame_intervals) / len(self.frame_intervals)
+        return 1.0 / mean if mean > 0 else 0.0
+
+    def summary(self):
+        """Estadísticas (ms) de la ventana reciente por etapa."""
+        stages = {}
+        for stage, buf in list(self.samples.items()):
+            if not buf:
+                continue
+            arr = np.fromiter(buf, dtype=np.float64) * 1000.0
+            stages[stage] = {
+                "mean_ms": float(arr.mean()),
+                "p50_ms": float(np.percentile(arr, 50)),
+                "p95_ms": float(np.percentile(arr, 95)),
+                "max_ms": float(arr.max()),
+            }
+        return {
+            "fps": self.fps(),
+            "counters": dict(self.counters),
+            "stages": stages,
+        }
+
+    def format_overlay(self):
+        """Texto corto para mostrar junto a las estadísticas."""
+        summary = self.summary()
+        lines = [f"FPS: {summary['fps']:5.1f}"]
+        for stage, stats in summary["stages"].items():
+            lines.append(f"{stage:<12} {stats['mean_ms']:6.1f} ms (p95 {stats['p95_ms']:5.1f})")
+        counters = summary["counters"]
+        lines.append(f"Tarde: {counters['late']}  Descartados: {counters['dropped']}")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Escribe resumen y muestras recientes en JSON."""
+        data = self.summary()
+        data["started_at"] = self.started_at
+        data["ended_at"] = time.time()
+        data["samples_ms"] = {
+            stage: [round(v * 1000.0, 3) for v in buf]
+            for stage, buf in list(self.samples.items())
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
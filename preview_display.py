@@ -0,0 +1,76 @@
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+
+class PreviewDisplay:
+    """
+    Camino de visualización para la vista previa en Tk:
+    - Reutiliza un buffer RGBA preasignado (y uno BGR reducido si scale < 1):
+      cv2.resize/cvtColor escriben directamente en ellos.
+    - Reutiliza un único ImageTk.PhotoImage y lo actualiza con paste();
+      la imagen PIL comparte memoria con el buffer (Image.frombuffer). Se usa
+      RGBA porque PIL solo mapea sin copiar modos de 4 bytes por píxel.
+    - max_fps limita la vista previa independientemente del análisis.
+    Los buffers se vuelven a crear solo si cambia la resolución del frame.
+    """
+
+    def __init__(self, label, scale=1.0, max_fps=None):
+        self.label = label
+        self.scale = scale
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.frames_shown = 0
+        self.frames_skipped = 0
+
+        self._source_shape = None
+        self._small = None
+        self._rgba = None
+        self._image = None
+        self._photo = None
+        self._last_shown = None
+
+    def _allocate(self, shape):
+        h, w = shape[:2]
+        out_w = max(1, int(round(w * self.scale)))
+        out_h = max(1, int(round(h * self.scale)))
+        self._small = None
+        if (out_w, out_h) != (w, h):
+            self._small = np.empty((out_h, out_w, 3), dtype=np.uint8)
+        self._rgba = np.empty((out_h, out_w, 4), dtype=np.uint8)
+        #Vista PIL sobre el mismo buffer (sin copia)
+        self._image = Image.frombuffer("RGBA", (out_w, out_h), self._rgba, "raw", "RGBA", 0, 1)
+        self._photo = ImageTk.PhotoImage(image=self._image)
+        self.label.config(image=self._photo)
+        self._source_shape = shape
+
+    def due(self, now=None):
+        """True si ya pasó el intervalo mínimo desde el último frame mostrado."""
+        if self._last_shown is None or not self.min_interval:
+            return True
+        now = time.perf_counter() if now is None else now
+        return now - self._last_shown >= self.min_interval
+
+    def show(self, frame):
+        """Muestra un frame BGR. Devuelve False si se omitió por el límite de FPS."""
+        now = time.perf_counter()
+        if not self.due(now):
+            self.frames_skipped += 1
+            return False
+        self._last_shown = now
+
+        if frame.shape != self._source_shape:
+            self._allocate(frame.shape)
+
+        src = frame
+        if self._small is not None:
+            cv2.resize(frame, (self._small.shape[1], self._small.shape[0]),
+                       dst=self._small, interpolation=cv2.INTER_AREA)
+            src = self._small
+        cv2.cvtColor(src, cv2.COLOR_BGR2RGBA, dst=self._rgba)
+
+        #Actualiza en el lugar la imagen de Tk que ya muestra el label
+        self._photo.paste(self._image)
+        self.frames_shown += 1
+        return True
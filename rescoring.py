@@ -0,0 +1,261 @@
+"""
+Re-puntuación vectorizada de sesiones grabadas.
+
+A partir de las cajas de rostro por frame guardadas en la línea de tiempo
+(timeline_log) recalcula, sin volver a correr la detección, la calibración
+del centro neutral, la dirección de cada frame y todos los totales de
+`FaceDetectionModule.stats` y del resumen, para muchos juegos de parámetros
+a la vez (thresh_x_ratio, thresh_y_ratio, smooth_calibration,
+calibration_frames, calibration_alpha, suspicious_pct).
+
+Uso:
+    python rescoring.py logs/*.bin --thresh-x 0.2 0.25 0.3 --thresh-y 0.1 0.15 0.2
+"""
+import argparse
+import itertools
+
+import numpy as np
+
+from exam_summary import SUSPICIOUS_PCT
+from timeline_log import DIRECTION_CODES, read_timeline
+
+#Frames procesados por bloque (acota la memoria P x N)
+CHUNK_FRAMES = 65536
+
+DEFAULT_PARAMS = {
+    "thresh_x_ratio": 0.25,
+    "thresh_y_ratio": 0.15,
+    "smooth_calibration": False,
+    "calibration_frames": 30,
+    "calibration_alpha": 0.1,
+    "suspicious_pct": SUSPICIOUS_PCT,
+}
+
+STAT_KEYS = ("left", "right", "up", "down", "attention", "no_attention")
+
+
+def make_param_grid(**values):
+    """
+    Producto cartesiano de parámetros -> dict de arreglos de largo P.
+    Los parámetros no indicados toman el valor de DEFAULT_PARAMS.
+    """
+    names = list(DEFAULT_PARAMS)
+    lists = [np.atleast_1d(values.get(name, DEFAULT_PARAMS[name])) for name in names]
+    combos = list(itertools.product(*lists))
+    grid = {name: np.array([c[i] for c in combos]) for i, name in enumerate(names)}
+    grid["calibration_frames"] = grid["calibration_frames"].astype(np.int64)
+    grid["smooth_calibration"] = grid["smooth_calibration"].astype(bool)
+    return grid
+
+
+def session_arrays(records):
+    """
+    Columnas necesarias de los registros de una línea de tiempo.
+    - dt: tiempo de cabeza de cada frame (dentro de la ventana).
+    - out_dt: tiempo fuera de la ventana de cada frame.
+    """
+    direction = records["direction"]
+    x = records["x"].astype(np.int64)
+    y = records["y"].astype(np.int64)
+    w = records["w"].astype(np.int64)
+    h = records["h"].astype(np.int64)
+    analyzed = direction != DIRECTION_CODES["none"]
+    out_dt = records["out_dt"].astype(np.float64)
+    return {
+        "dt": records["dt"].astype(np.float64) - out_dt,
+        "out_dt": out_dt,
+        "analyzed": analyzed,
+        "detected": analyzed & (direction != DIRECTION_CODES["not_detected"]) & (w > 0),
+        #Mismo redondeo que process_frame (x + w // 2)
+        "cx": x + w // 2,
+        "cy": y + h // 2,
+        "w": w,
+        "h": h,
+    }
+
+
+def _neutral_centers(cx, cy, calib_frames, alpha):
+    """
+    Centro neutral por juego de parámetros tras `calib_frames` detecciones
+    con suavizado exponencial. cx/cy: centros de los primeros detectados.
+    """
+    n_params = len(calib_frames)
+    ncx = np.full(n_params, np.nan)
+    ncy = np.full(n_params, np.nan)
+    k_max = int(min(calib_frames.max(initial=0), len(cx)))
+    for k in range(k_max):
+        active = calib_frames > k
+        if k == 0:
+            ncx[active] = cx[0]
+            ncy[active] = cy[0]
+        else:
+            a = alpha[active]
+            ncx[active] = ncx[active] * (1 - a) + cx[k] * a
+            ncy[active] = ncy[active] * (1 - a) + cy[k] * a
+    return ncx, ncy
+
+
+def _classify(session, idx, order, params, ncx, ncy):
+    """
+    Direcciones de los frames con rostro `idx` (n-ésimas detecciones
+    `order`) para cada juego de parámetros. Devuelve máscaras (P, k) de
+    left, right, up y down.
+    """
+    in_calib = order[None, :] < params["calibration_frames"][:, None]
+
+    #Sin calibración (calibration_frames=0) se usa el centro del propio rostro
+    cx = session["cx"][idx][None, :]
+    cy = session["cy"][idx][None, :]
+    dx = np.where(np.isnan(ncx)[:, None], 0.0, cx - ncx[:, None])
+    dy = np.where(np.isnan(ncy)[:, None], 0.0, cy - ncy[:, None])
+    tx = session["w"][idx][None, :] * params["thresh_x_ratio"][:, None]
+    ty = session["h"][idx][None, :] * params["thresh_y_ratio"][:, None]
+
+    #Mismo orden de reglas que process_frame
+    left = ~in_calib & (dx < -tx)
+    right = ~in_calib & ~left & (dx > tx)
+    rest = ~in_calib & ~left & ~right
+    up = rest & (dy < -ty)
+    down = rest & ~up & (dy > ty)
+    return left, right, up, down
+
+
+def _carry_over(session, det_idx, params, ncx, ncy):
+    """
+    Parte de cada frame no analizado antes de salir de la ventana: el motor
+    la cuenta según el estado de cabeza del último frame analizado (atento
+    si no hubo ninguno). Devuelve (atención, no atención), de largo P.
+    """
+    n_params = len(params["calibration_frames"])
+    attention = np.zeros(n_params)
+    no_attention = np.zeros(n_params)
+    dt = session["dt"]
+    analyzed = session["analyzed"]
+    carry_idx = np.flatnonzero(~analyzed & (dt > 0))
+    if len(carry_idx) == 0:
+        return attention, no_attention
+
+    analyzed_idx = np.flatnonzero(analyzed)
+    pos = np.searchsorted(analyzed_idx, carry_idx) - 1
+    has_prev = pos >= 0
+    d = dt[carry_idx]
+    attention += d[~has_prev].sum()
+
+    prev = analyzed_idx[pos[has_prev]]
+    d = d[has_prev]
+    prev_detected = session["detected"][prev]
+    no_attention += d[~prev_detected].sum()
+
+    #Con rostro: atento si no estaba girado según cada juego de parámetros
+    prev = prev[prev_detected]
+    d = d[prev_detected][None, :]
+    turned = np.logical_or.reduce(
+        _classify(session, prev, np.searchsorted(det_idx, prev), params, ncx, ncy)
+    )
+    no_attention += (turned * d).sum(axis=1)
+    attention += (~turned * d).sum(axis=1)
+    return attention, no_attention
+
+
+def rescore(session, params):
+    """
+    Recalcula stats y totales de una sesión para P juegos de parámetros.
+    Devuelve un dict de arreglos de largo P con las claves de
+    FaceDetectionModule.stats más total_exam_time, attention_time,
+    no_attention_time, non_attention_pct y suspicious.
+    """
+    #Sin smooth_calibration solo calibra el primer rostro (como process_frame)
+    calib_frames = np.where(params["smooth_calibration"], params["calibration_frames"],
+                            np.minimum(params["calibration_frames"], 1))
+    params = dict(params, calibration_frames=calib_frames)
+    n_params = len(calib_frames)
+    dt = session["dt"]
+    detected = session["detected"]
+
+    det_idx = np.flatnonzero(detected)
+    det_cx = session["cx"][det_idx]
+    det_cy = session["cy"][det_idx]
+    ncx, ncy = _neutral_centers(det_cx, det_cy, calib_frames, params["calibration_alpha"])
+
+    stats = {key: np.zeros(n_params) for key in STAT_KEYS}
+
+    #Frames analizados sin rostro: no atención por pérdida de cara
+    stats["no_attention"] += dt[session["analyzed"] & ~detected].sum()
+
+    #Frames con rostro, por bloques: (P, bloque)
+    for start in range(0, len(det_idx), CHUNK_FRAMES):
+        idx = det_idx[start:start + CHUNK_FRAMES]
+        order = np.arange(start, start + len(idx))  #n-ésima detección
+        d = dt[idx][None, :]
+        left, right, up, down = _classify(session, idx, order, params, ncx, ncy)
+        turned = left | right | up | down
+
+        stats["left"] += (left * d).sum(axis=1)
+        stats["right"] += (right * d).sum(axis=1)
+        stats["up"] += (up * d).sum(axis=1)
+        stats["down"] += (down * d).sum(axis=1)
+        stats["no_attention"] += (turned * d).sum(axis=1)
+        stats["attention"] += (~turned * d).sum(axis=1)
+
+    #Totales del examen, con el mismo reparto de dt que SessionEngine
+    carry_attention, carry_no_attention = _carry_over(session, det_idx, params, ncx, ncy)
+    off_window = session["out_dt"].sum()
+    total = dt.sum() + off_window
+    results = dict(stats)
+    results["total_exam_time"] = np.full(n_params, total)
+    results["attention_time"] = stats["attention"] + carry_attention
+    results["no_attention_time"] = stats["no_attention"] + carry_no_attention + off_window
+    if total > 0:
+        results["non_attention_pct"] = results["no_attention_time"] / total * 100.0
+    else:
+        results["non_attention_pct"] = np.zeros(n_params)
+    results["suspicious"] = results["non_attention_pct"] > params["suspicious_pct"]
+    return results
+
+
+def rescore_many(paths, params):
+    """Re-puntúa varias líneas de tiempo; devuelve arreglos (S, P) por clave."""
+    per_session = [rescore(session_arrays(read_timeline(path).records), params) for path in paths]
+    if not per_session:
+        return {}
+    return {key: np.stack([r[key] for r in per_session]) for key in per_session[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-puntuación de sesiones sin volver a detectar.")
+    parser.add_argument("timelines", nargs="+", help="Archivos de línea de tiempo (.bin)")
+    parser.add_argument("--thresh-x", nargs="*", type=float, default=[DEFAULT_PARAMS["thresh_x_ratio"]])
+    parser.add_argument("--thresh-y", nargs="*", type=float, default=[DEFAULT_PARAMS["thresh_y_ratio"]])
+    parser.add_argument("--smooth-calibration", nargs="*", type=int, choices=(0, 1),
+                        default=[int(DEFAULT_PARAMS["smooth_calibration"])],
+                        help="1 = centro neutral suavizado sobre --calibration-frames rostros")
+    parser.add_argument("--calibration-frames", nargs="*", type=int,
+                        default=[DEFAULT_PARAMS["calibration_frames"]])
+    parser.add_argument("--alpha", nargs="*", type=float, default=[DEFAULT_PARAMS["calibration_alpha"]])
+    parser.add_argument("--suspicious-pct", nargs="*", type=float, default=[SUSPICIOUS_PCT])
+    args = parser.parse_args()
+
+    params = make_param_grid(
+        thresh_x_ratio=args.thresh_x,
+        thresh_y_ratio=args.thresh_y,
+        smooth_calibration=args.smooth_calibration,
+        calibration_frames=args.calibration_frames,
+        calibration_alpha=args.alpha,
+        suspicious_pct=args.suspicious_pct,
+    )
+    results = rescore_many(args.timelines, params)
+
+    suspicious_rate = results["suspicious"].mean(axis=0) * 100.0
+    mean_pct = results["non_attention_pct"].mean(axis=0)
+    print("thresh_x thresh_y suav calib alpha  umbral | no_atención media  % sospechosos")
+    for p in range(len(params["thresh_x_ratio"])):
+        print(
+            f"{params['thresh_x_ratio'][p]:8.2f} {params['thresh_y_ratio'][p]:8.2f} "
+            f"{'sí' if params['smooth_calibration'][p] else 'no':>4} "
+            f"{params['calibration_frames'][p]:5d} {params['calibration_alpha'][p]:5.2f} "
+            f"{params['suspicious_pct'][p]:6.1f} | {mean_pct[p]:17.1f}  {suspicious_rate[p]:13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
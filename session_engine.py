@@ -0,0 +1,289 @@
+import threading
+import time
+
+import cv2
+
+from frame_buffers import BufferRing, read_into
+from timeline_log import TimelineWriter
+
+
+class SessionEngine:
+    """
+    Motor de una sesión de examen, independiente de la interfaz:
+    - Es dueño de la fuente de frames (cap), FaceDetectionModule y
+      EventMonitor, y lleva la contabilidad de tiempos del examen.
+    - analyze_frame(frame, now): espejo, detección y tiempos de un frame;
+      step() además lee el frame de la fuente.
+    - start_exam() / stop_exam() / get_results(): control y totales en el
+      formato de exam_summary.build_summary.
+    ProctoringApp (Tk) y monitor_daemon (sin interfaz) son dos frentes sobre
+    este mismo motor; batch_analysis y monitor_server lo usan sin monitor
+    de ventanas (cap=None si los frames llegan de afuera, con su timestamp,
+    por analyze_frame / analyze_frames).
+    Con event_monitor=None no se monitorean ventanas (todo el tiempo cuenta
+    como dentro del examen). El tiempo fuera de la ventana sale de los
+    timestamps de los cambios de foco (EventMonitor.out_times), no de frames
+    enteros: el dt de cada frame se reparte entre fuera y dentro.
+    Con timeline_path graba la línea de tiempo por frame durante el examen
+    ("{start}" se reemplaza por la hora de inicio).
+    reuse_buffers usa anillos preasignados para la lectura (capture_slots;
+    0 si otro componente lee la fuente) y el espejo (mirror_slots).
+    mirror=False analiza los frames sin espejo (las direcciones
+    izquierda/derecha dependen de ello).
+    """
+
+    def __init__(self, cap, face_detector, event_monitor=None, perf=None, scheduler=None,
+                 timeline_path=None, reuse_buffers=False, capture_slots=1, mirror_slots=1,
+                 mirror=True):
+        self.cap = cap
+        self.mirror = mirror
+        self.face_detector = face_detector
+        self.event_monitor = event_monitor
+        #PerfMonitor y AdaptiveScheduler opcionales
+        self.perf = perf
+        self.scheduler = scheduler
+
+        #Buffers reutilizables
+        self._capture_ring = BufferRing(capture_slots) if reuse_buffers and capture_slots else None
+        self._capture_shape = None
+        self._mirror_ring = BufferRing(mirror_slots) if reuse_buffers else None
+
+        #------Estado del examen------
+        self.is_exam_running = False
+        self.exam_start_time = None
+        self.last_frame_time = None
+        self.frames_analyzed = 0
+        self.last_direction = None
+
+        #Línea de tiempo por frame (opcional)
+        self.timeline_path = timeline_path
+        self.timeline = None
+
+        #Protege tiempos y estado compartidos con el hilo de detección
+        self._state_lock = threading.Lock()
+        self.reset_global_stats()
+
+    def reset_global_stats(self):
+        #Tiempos globales
+        self.total_exam_time = 0.0
+        self.attention_time = 0.0
+        self.no_attention_time = 0.0
+        #Tiempos por cambios de pantalla
+        self.mouse_window_time = 0.0
+        self.keyboard_window_time = 0.0
+        #Tiempo fuera (todas las causas) ya sumado a no_attention_time
+        self._out_counted = 0.0
+        #Último estado de la cabeza (para la parte del frame antes de salir)
+        self._head_attentive = True
+
+    #--------Control del examen----------
+
+    def start_exam(self):
+        if self.is_exam_running:
+            return
+        with self._state_lock:
+            self.is_exam_running = True
+            self.exam_start_time = time.time()
+            #dt del primer frame se mide en el reloj de la fuente
+            #(sin fuente propia, desde el primer frame recibido)
+            self.last_frame_time = self.cap.clock() if self.cap is not None else None
+
+            self.face_detector.reset_stats()
+            if self.event_monitor is not None:
+                self.event_monitor.reset_stats()
+            self.reset_global_stats()
+
+            if self.timeline_path:
+                self.timeline = TimelineWriter(
+                    self.timeline_path.format(start=int(self.exam_start_time)),
+                    start_time=self.last_frame_time,
+                )
+
+        #La ventana actual será la "ventana de examen"
+        if self.event_monitor is not None:
+            try:
+                self.event_monitor.start_monitoring()
+            except Exception:
+                #p. ej. pynput sin display: el examen no queda iniciado a medias
+                with self._state_lock:
+                    self.is_exam_running = False
+                    if self.timeline is not None:
+                        self.timeline.close()
+                        self.timeline = None
+                raise
+
+    def stop_exam(self):
+        """Detiene el examen y devuelve los resultados."""
+        if not self.is_exam_running:
+            return self.get_results()
+        with self._state_lock:
+            self.is_exam_running = False
+            if self.timeline is not None:
+                self.timeline.close()
+                self.timeline = None
+        if self.event_monitor is not None:
+            self.event_monitor.stop_monitoring()
+        return self.get_results()
+
+    #-----------Frames------------
+
+    def read(self):
+        """Lee el próximo frame de la fuente (en el anillo de buffers si hay uno)."""
+        perf = self.perf
+        if perf:
+            t0 = perf.clock()
+        if self._capture_ring is not None:
+            ret, frame = read_into(self.cap, self._capture_ring, self._capture_shape)
+            self._capture_shape = frame.shape if ret else None
+        else:
+            ret, frame = self.cap.read()
+        if ret and perf:
+            perf.lap("camera_read", t0)
+        return ret, frame
+
+    def step(self):
+        """Lee y analiza un frame. Devuelve (ret, frame anotado)."""
+        ret, frame = self.read()
+        if not ret:
+            return False, None
+        return True, self.analyze_frame(frame, self.cap.last_timestamp)
+
+    def analyze_frame(self, frame, now):
+        """
+        Espejo, detección y contabilidad de tiempos de un frame.
+        - now: hora de captura del frame; dt se mide contra el último frame
+          procesado, así que los frames descartados no pierden tiempo.
+        Devuelve el frame anotado.
+        """
+        perf = self.perf
+        if perf:
+            t0 = perf.clock()
+        if self.mirror:
+            mirror = self._mirror_ring.next(frame.shape) if self._mirror_ring is not None else None
+            frame = cv2.flip(frame, 1, dst=mirror)  # espejo
+            if perf:
+                perf.lap("flip", t0)
+
+        with self._state_lock:
+            #Calculamos dt
+            if self.last_frame_time is None:
+                dt = 0.0
+            else:
+                dt = now - self.last_frame_time
+            self.last_frame_time = now
+            self.frames_analyzed += 1
+
+            #Procesamiento solo si el examen corre
+            if self.is_exam_running and dt > 0:
+                out_dt = 0.0
+                if self.event_monitor is not None:
+                    on_exam_window, cause = self.event_monitor.check_window()
+                    #Tiempo fuera dentro de este frame, según los timestamps de los cambios
+                    out = self.event_monitor.out_times()
+                    out_dt = min(max(sum(out.values()) - self._out_counted, 0.0), dt)
+                    self._out_counted += out_dt
+                    self.mouse_window_time = out["mouse"]
+                    self.keyboard_window_time = out["keyboard"]
+                else:
+                    on_exam_window, cause = True, None
+
+                #Tiempo de no atención por cambio de pantalla
+                self.total_exam_time += dt
+                self.no_attention_time += out_dt
+                in_dt = dt - out_dt
+
+                if not on_exam_window:
+                    #No procesamos cabeza para no mezclar causas; lo que quedó
+                    #del frame antes de salir cuenta según el último estado
+                    processed_frame = frame
+                    direction = "none"
+                    head_attentive = self._head_attentive
+                else:
+                    processed_frame, head_attentive, direction = self.face_detector.process_frame(
+                        frame, in_dt
+                    )
+                    self._head_attentive = head_attentive
+
+                self._add_head_time(head_attentive, in_dt)
+
+                if self.timeline is not None:
+                    box = self.face_detector.last_box if direction != "none" else None
+                    self.timeline.write(now, dt, direction, box, on_exam_window, cause, out_dt)
+            else:
+                #Examen parado: solo mostramos cámara sin contar tiempos
+                processed_frame, head_attentive, direction = self.face_detector.process_frame(
+                    frame, 0.0
+                )
+                if self.is_exam_running:
+                    #Frame sin dt: no suma tiempo pero cuenta para la calibración
+                    self._head_attentive = head_attentive
+                    if self.timeline is not None:
+                        self.timeline.write(now, 0.0, direction, self.face_detector.last_box)
+            self.last_direction = direction
+
+        if self.scheduler is not None:
+            self.scheduler.observe(direction)
+        return processed_frame
+
+    def analyze_frames(self, frames, timestamps):
+        """
+        Versión por lotes de analyze_frame para análisis offline, sin monitor
+        de ventanas: una sola llamada de detección para todos los frames
+        (FaceDetectionModule.process_frames; sin tracking).
+        Devuelve la lista de frames anotados.
+        """
+        if self.event_monitor is not None:
+            raise ValueError("analyze_frames no admite monitor de ventanas")
+        if self.mirror:
+            frames = [cv2.flip(frame, 1) for frame in frames]
+
+        with self._state_lock:
+            dts = []
+            for ts in timestamps:
+                dts.append(0.0 if self.last_frame_time is None else ts - self.last_frame_time)
+                self.last_frame_time = ts
+            self.frames_analyzed += len(frames)
+
+            running = self.is_exam_running
+            outputs = self.face_detector.process_frames(
+                frames, [dt if running else 0.0 for dt in dts]
+            )
+            processed = []
+            for (processed_frame, head_attentive, direction), dt in zip(outputs, dts):
+                if running and dt > 0:
+                    self.total_exam_time += dt
+                    self._add_head_time(head_attentive, dt)
+                processed.append(processed_frame)
+                self.last_direction = direction
+        return processed
+
+    def _add_head_time(self, head_attentive, dt):
+        if head_attentive:
+            self.attention_time += dt
+        else:
+            self.no_attention_time += dt
+
+    #-------------Resultados---------------
+
+    def get_results(self):
+        """Totales de la sesión en el formato de exam_summary.build_summary."""
+        if self.event_monitor is not None:
+            event_stats = self.event_monitor.get_stats()
+        else:
+            event_stats = {"mouse_changes": 0, "keyboard_changes": 0}
+        return {
+            "total_exam_time": self.total_exam_time,
+            "attention_time": self.attention_time,
+            "no_attention_time": self.no_attention_time,
+            "mouse_window_time": self.mouse_window_time,
+            "keyboard_window_time": self.keyboard_window_time,
+            "face_stats": self.face_detector.get_stats(),
+            "event_stats": event_stats,
+        }
+
+    def close(self):
+        """Detiene el examen si corre y libera la fuente."""
+        if self.is_exam_running:
+            self.stop_exam()
+        if self.cap is not None and self.cap.isOpened():
+            self.cap.release()
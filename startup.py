@@ -0,0 +1,52 @@
+import threading
+import time
+
+
+class StartupLoader:
+    """
+    Corre tareas de arranque en hilos paralelos y registra su duración.
+    - run(name, fn): lanza fn() en segundo plano; su resultado queda en
+      results[name] (o la excepción en errors[name]).
+    - mark(name): registra un hito (p. ej. ventana visible, primer frame).
+    Todos los tiempos se miden desde la creación del loader.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.results = {}
+        self.errors = {}
+        self.durations = {}
+        self.marks = {}
+        self._pending = {}
+
+    def run(self, name, fn):
+        def task():
+            start = time.perf_counter()
+            try:
+                self.results[name] = fn()
+            except Exception as exc:
+                self.errors[name] = exc
+            end = time.perf_counter()
+            self.durations[name] = end - start
+            self.marks[name] = end - self.t0
+
+        thread = threading.Thread(target=task, name=f"startup-{name}", daemon=True)
+        self._pending[name] = thread
+        thread.start()
+
+    def done(self, *names):
+        names = names or tuple(self._pending)
+        return all(not self._pending[name].is_alive() for name in names)
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.t0
+
+    def report(self):
+        """Desglose legible: hitos en orden y duración de cada tarea."""
+        lines = []
+        for name, at in sorted(self.marks.items(), key=lambda item: item[1]):
+            took = self.durations.get(name)
+            extra = f" (tarea {took * 1000:.0f} ms)" if took is not None else ""
+            lines.append(f"{name:<12} {at * 1000:7.0f} ms{extra}")
+        return "\n".join(lines)
@@ -0,0 +1,235 @@
+"""
+Cliente del servicio de agregación (stats_service) y simulador de aulas.
+
+StatsClient corre en un hilo propio: cada `interval` segundos toma una foto
+de los totales de la sesión (snapshot_fn, p. ej. ProctoringApp.get_results),
+calcula qué campos cambiaron desde el último envío y manda un solo mensaje
+con esos incrementos. Si la conexión se cae reintenta y, al reconectar,
+manda los totales completos.
+
+Uso (simulación de un aula contra un servicio local):
+    python stats_client.py --clients 300 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import numpy as np
+
+from stats_service import FIELDS, FIELD_INDEX, StatsService, flatten_results
+
+
+class DeltaEncoder:
+    """
+    Arma los mensajes del protocolo a partir de totales sucesivos.
+    Los incrementos se redondean (decimals) y se acumulan sobre lo ya
+    enviado, así el redondeo no se arrastra.
+    """
+
+    def __init__(self, decimals=3):
+        self.decimals = decimals
+        self.seq = 0
+        self._sent = None
+
+    def reset(self):
+        """El próximo mensaje lleva los totales completos."""
+        self._sent = None
+
+    def encode(self, values, running):
+        """Devuelve la línea a enviar (bytes) o None si no cambió nada."""
+        tolerance = 10.0 ** -self.decimals
+        full = self._sent is None or any(v < s - tolerance for v, s in zip(values, self._sent))
+        if full:
+            #Primera vez, reconexión o examen reiniciado (los totales bajaron)
+            self._sent = [0.0] * len(values)
+        delta = {}
+        sent = self._sent
+        for i, value in enumerate(values):
+            step = round(value - sent[i], self.decimals)
+            if step:
+                delta[i] = step
+                sent[i] += step
+        if not delta and not full:
+            return None
+
+        message = {"q": self.seq, "r": int(running), "d": delta}
+        if full:
+            message["f"] = 1
+        self.seq += 1
+        return (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class StatsClient:
+    """
+    Envía al servicio los incrementos de stats de un alumno.
+    - snapshot_fn(): dict con el formato de ProctoringApp.get_results().
+    - running_fn(): True mientras el examen corre.
+    - interval: segundos entre envíos (los cambios de ese lapso van juntos).
+    - heartbeat: reenvía aunque no haya cambios cada tantos segundos.
+    """
+
+    def __init__(self, host, port, student_id, snapshot_fn, running_fn=lambda: True,
+                 interval=1.0, heartbeat=10.0):
+        self.address = (host, port)
+        self.student_id = student_id
+        self.snapshot_fn = snapshot_fn
+        self.running_fn = running_fn
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.sent_messages = 0
+        self.sent_bytes = 0
+
+        self._encoder = DeltaEncoder()
+        self._sock = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="stats-client", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(self.interval + 1.0)
+        self._thread = None
+        self._disconnect()
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=2.0)
+        sock.sendall((json.dumps({"hello": self.student_id}) + "\n").encode("utf-8"))
+        self._sock = sock
+        self._encoder.reset()
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _run(self):
+        last_send = 0.0
+        stopping = False
+        while not stopping:
+            #Al detenerse se hace un último envío con los totales finales
+            stopping = self._stop_event.wait(self.interval)
+            try:
+                if self._sock is None:
+                    self._connect()
+                line = self._encoder.encode(flatten_results(self.snapshot_fn()), self.running_fn())
+                now = time.monotonic()
+                if line is None and now - last_send >= self.heartbeat:
+                    line = b'{"d":{}}\n'
+                if line is not None:
+                    self._sock.sendall(line)
+                    self.sent_messages += 1
+                    self.sent_bytes += len(line)
+                    last_send = now
+            except OSError:
+                #Servicio caído: se reintenta en el próximo intervalo
+                self._disconnect()
+
+
+#-----------Simulación-----------
+
+async def _simulated_client(host, port, student_id, duration, interval, seed):
+    """Un alumno sintético: acumula tiempos al azar y los envía como StatsClient."""
+    rng = np.random.default_rng(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write((json.dumps({"hello": student_id}) + "\n").encode("utf-8"))
+    encoder = DeltaEncoder()
+    values = [0.0] * len(FIELDS)
+    p_away = rng.uniform(0.05, 0.6)  #propensión a no atender
+    sent = 0
+
+    await asyncio.sleep(rng.uniform(0, interval))  #desfasa los envíos
+    start = time.monotonic()
+    while time.monotonic() - start < duration:
+        dt = interval
+        values[FIELD_INDEX["total_exam_time"]] += dt
+        if rng.random() < p_away:
+            values[FIELD_INDEX["no_attention_time"]] += dt
+            values[FIELD_INDEX[("left", "right", "up", "down")[rng.integers(4)]]] += dt
+        else:
+            values[FIELD_INDEX["attention_time"]] += dt
+        if rng.random() < 0.01:
+            values[FIELD_INDEX["mouse_changes"]] += 1
+        line = encoder.encode(values, True)
+        if line is not None:
+            writer.write(line)
+            await writer.drain()
+            sent += 1
+        await asyncio.sleep(interval)
+
+    writer.close()
+    return values, sent
+
+
+async def simulate(n_clients=100, duration=10.0, interval=1.0, service=None):
+    """
+    Levanta un StatsService local (si no se da uno) y conecta `n_clients`
+    alumnos sintéticos. Verifica que los totales del servicio coincidan
+    con los de cada cliente.
+    """
+    own_service = service is None
+    if own_service:
+        service = StatsService(max_students=max(1000, n_clients))
+    port, http_port = await service.start(port=0, http_port=0)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        _simulated_client("127.0.0.1", port, f"alumno{i:04d}", duration, interval, seed=i)
+        for i in range(n_clients)
+    ))
+    await asyncio.sleep(0.2)  #deja que el servicio procese lo último
+    elapsed = time.perf_counter() - start
+
+    #Consulta por HTTP como lo haría el tablero
+    reader, writer = await asyncio.open_connection("127.0.0.1", http_port)
+    writer.write(b"GET /room HTTP/1.0\r\n\r\n")
+    response = await reader.read()
+    writer.close()
+    room = json.loads(response.split(b"\r\n\r\n", 1)[1])
+
+    by_id = {s["student"]: s for s in room["students"]}
+    max_error = 0.0
+    for i, (values, _) in enumerate(results):
+        state = by_id[f"alumno{i:04d}"]
+        for name, value in zip(FIELDS, values):
+            max_error = max(max_error, abs(state[name] - value))
+
+    if own_service:
+        await service.close()
+    return {
+        "clients": n_clients,
+        "elapsed": elapsed,
+        "messages": room["summary"]["messages"],
+        "messages_per_s": room["summary"]["messages"] / elapsed if elapsed > 0 else 0.0,
+        "suspicious": room["summary"]["suspicious"],
+        "max_error": max_error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula un aula contra el servicio de stats.")
+    parser.add_argument("--clients", type=int, default=200, help="Alumnos simulados")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de simulación")
+    parser.add_argument("--interval", type=float, default=1.0, help="Segundos entre envíos")
+    args = parser.parse_args()
+
+    report = asyncio.run(simulate(args.clients, args.duration, args.interval))
+    print(
+        f"[stats] {report['clients']} clientes, {report['messages']} mensajes en "
+        f"{report['elapsed']:.1f}s ({report['messages_per_s']:.0f} msg/s), "
+        f"{report['suspicious']} sospechosos, error máx. {report['max_error']:.2e}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+class StatsPanel:
+    """
+    Capa de dibujo del panel de estadísticas en Tk:
+    - Se refresca a su propia frecuencia (max_fps -> interval_ms, que usa
+      el loop de after() de la app), no a la de la cámara.
+    - Guarda el último texto de cada label y solo llama a config() cuando
+      el texto cambió: el trabajo de layout/redibujo de Tk depende de cuán
+      seguido cambian los números, no de cuántos frames llegan.
+    Todo texto de los labels debe pasar por set()/show() para que la caché
+    refleje lo que está en pantalla.
+    """
+
+    def __init__(self, labels, max_fps=4.0):
+        #labels: dict nombre -> tk.Label
+        self.labels = labels
+        self.interval = 1.0 / max_fps if max_fps else 0.0
+        self.refreshes = 0
+        self.label_updates = 0
+        self.unchanged = 0
+
+        self._texts = {name: None for name in labels}
+
+    @property
+    def interval_ms(self):
+        return max(1, int(self.interval * 1000))
+
+    def set(self, name, text):
+        """Cambia el texto de un label si difiere del que muestra. Devuelve True si cambió."""
+        if self._texts[name] == text:
+            self.unchanged += 1
+            return False
+        self._texts[name] = text
+        self.labels[name].config(text=text)
+        self.label_updates += 1
+        return True
+
+    def show(self, **texts):
+        """Aplica varios textos a la vez (los labels no indicados quedan igual)."""
+        self.refreshes += 1
+        changed = 0
+        for name, text in texts.items():
+            changed += self.set(name, text)
+        return changed
+
+    def get_stats(self):
+        return {
+            "refreshes": self.refreshes,
+            "label_updates": self.label_updates,
+            "unchanged": self.unchanged,
+        }
@@ -0,0 +1,322 @@
+"""
+Servicio de agregación en vivo para un aula de examen.
+
+Cada ProctoringApp (o un cliente simulado) abre una conexión TCP y envía
+líneas JSON compactas con los incrementos de sus stats desde el último envío
+(ver stats_client.StatsClient). El servicio, en asyncio, mantiene el estado
+por alumno en un arreglo fijo de floats (memoria acotada por alumno y por
+cantidad de alumnos) y lo expone por HTTP:
+- GET /          tabla de texto del aula (para mirar con curl o el navegador)
+- GET /room      JSON con todos los alumnos y un resumen
+- GET /student/<id>  JSON de un alumno
+
+Protocolo (una línea JSON por mensaje):
+- {"hello": "<alumno>"}                  primer mensaje de la conexión
+- {"q": seq, "r": 0|1, "f": 1, "d": {...}}  "d": índice de campo -> valor;
+  con "f" los valores son totales (al conectar o tras reiniciar el examen),
+  sin "f" son incrementos. "r" indica si el examen está corriendo.
+Las líneas que no cumplen esta forma se descartan sin cortar la conexión.
+
+Uso:
+    python stats_service.py --port 8765 --http-port 8766
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+
+from exam_summary import SUSPICIOUS_PCT
+
+#Campos que viajan, en orden fijo (el índice es la clave en el protocolo)
+FIELDS = (
+    "total_exam_time",
+    "attention_time",
+    "no_attention_time",
+    "mouse_window_time",
+    "keyboard_window_time",
+    "left",
+    "right",
+    "up",
+    "down",
+    "mouse_changes",
+    "keyboard_changes",
+    "mouse_out_time",
+    "keyboard_out_time",
+)
+FIELD_INDEX = {name: i for i, name in enumerate(FIELDS)}
+
+#Largo máximo de una línea del protocolo y de un id de alumno
+MAX_LINE = 4096
+MAX_ID = 64
+
+
+def flatten_results(results):
+    """Dict de ProctoringApp.get_results() -> lista de valores en el orden de FIELDS."""
+    face = results["face_stats"]
+    events = results["event_stats"]
+    values = []
+    for name in FIELDS:
+        if name in results:
+            values.append(float(results[name]))
+        elif name in face:
+            values.append(float(face[name]))
+        else:
+            values.append(float(events.get(name, 0.0)))
+    return values
+
+
+def parse_message(line):
+    """
+    Decodifica y valida una línea de stats. Devuelve el mensaje con "d" como
+    {índice: float} o None si la línea no tiene la forma del protocolo (así
+    un mensaje malo no se aplica a medias).
+    """
+    try:
+        message = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(message, dict):
+        return None
+    delta = message.get("d") or {}
+    if not isinstance(delta, dict):
+        return None
+    parsed = {}
+    for key, value in delta.items():
+        try:
+            index = int(key)
+        except ValueError:
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            return None
+        if 0 <= index < len(FIELDS):
+            parsed[index] = float(value)
+    seq = message.get("q")
+    if seq is not None and (isinstance(seq, bool) or not isinstance(seq, int)):
+        return None
+    message["d"] = parsed
+    return message
+
+
+def parse_hello(line):
+    """Id de alumno del primer mensaje, o "" si no es un saludo válido."""
+    try:
+        hello = json.loads(line)
+    except ValueError:
+        return ""
+    if not isinstance(hello, dict) or not isinstance(hello.get("hello"), (str, int)):
+        return ""
+    return str(hello["hello"])[:MAX_ID]
+
+
+class StudentState:
+    """Totales de un alumno (tamaño fijo) y metadatos de la conexión."""
+
+    __slots__ = ("student_id", "values", "running", "connected", "last_seen", "seq", "messages")
+
+    def __init__(self, student_id):
+        self.student_id = student_id
+        self.values = [0.0] * len(FIELDS)
+        self.running = False
+        self.connected = 0  #conexiones abiertas con este id
+        self.last_seen = time.time()
+        self.seq = -1
+        self.messages = 0
+
+    def apply(self, message):
+        """Aplica un mensaje ya validado por parse_message."""
+        if message.get("f"):
+            self.values = [0.0] * len(FIELDS)
+        values = self.values
+        for index, value in message["d"].items():
+            values[index] += value
+        self.running = bool(message.get("r", self.running))
+        self.seq = message.get("q", self.seq)
+        self.last_seen = time.time()
+        self.messages += 1
+
+    def to_dict(self, suspicious_pct=SUSPICIOUS_PCT):
+        data = dict(zip(FIELDS, self.values))
+        total = data["total_exam_time"]
+        non_att_pct = data["no_attention_time"] / total * 100.0 if total > 0 else 0.0
+        data.update({
+            "student": self.student_id,
+            "running": self.running,
+            "connected": self.connected > 0,
+            "last_seen": self.last_seen,
+            "non_attention_pct": non_att_pct,
+            "suspicious": non_att_pct > suspicious_pct,
+        })
+        return data
+
+
+class StatsService:
+    """
+    Servidor asyncio: recibe los incrementos de los clientes y responde
+    consultas HTTP sobre el estado del aula.
+    - max_students: tope de alumnos distintos (los nuevos por encima se rechazan).
+    - suspicious_pct: mismo umbral que el resumen local.
+    """
+
+    def __init__(self, max_students=1000, suspicious_pct=SUSPICIOUS_PCT):
+        self.max_students = max_students
+        self.suspicious_pct = suspicious_pct
+        self.students = {}
+        self.connections = 0
+        self.messages = 0
+        self.rejected = 0
+        self._servers = []
+
+    #-----------Clientes-----------
+
+    async def handle_client(self, reader, writer):
+        self.connections += 1
+        state = None
+        try:
+            line = await reader.readline()
+            student_id = parse_hello(line) if line else ""
+            if not student_id:
+                return
+            state = self.students.get(student_id)
+            if state is None:
+                if len(self.students) >= self.max_students:
+                    self.rejected += 1
+                    return
+                state = self.students[student_id] = StudentState(student_id)
+            state.connected += 1
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = parse_message(line)
+                if message is None:
+                    continue
+                state.apply(message)
+                self.messages += 1
+        except (ValueError, ConnectionError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            if state is not None:
+                state.connected -= 1
+            self.connections -= 1
+            writer.close()
+
+    #-----------Consultas-----------
+
+    def room(self):
+        students = [s.to_dict(self.suspicious_pct) for s in self.students.values()]
+        connected = sum(s["connected"] for s in students)
+        return {
+            "students": students,
+            "summary": {
+                "students": len(students),
+                "connected": connected,
+                "running": sum(s["running"] for s in students),
+                "suspicious": sum(s["suspicious"] for s in students),
+                "messages": self.messages,
+                "rejected": self.rejected,
+            },
+        }
+
+    def format_room(self):
+        """Tabla de texto del aula, ordenada por % de no atención."""
+        room = self.room()
+        lines = [
+            f"{'alumno':<20} {'conect.':>7} {'duración':>9} {'no atenc.':>9} "
+            f"{'mouse':>6} {'teclado':>7} sospechoso"
+        ]
+        for s in sorted(room["students"], key=lambda s: s["non_attention_pct"], reverse=True):
+            lines.append(
+                f"{s['student']:<20} {'sí' if s['connected'] else 'no':>7} "
+                f"{s['total_exam_time']:8.1f}s {s['non_attention_pct']:8.1f}% "
+                f"{int(s['mouse_changes']):>6} {int(s['keyboard_changes']):>7} "
+                f"{'SI' if s['suspicious'] else 'NO'}"
+            )
+        summary = room["summary"]
+        lines.append("")
+        lines.append(
+            f"{summary['students']} alumnos, {summary['connected']} conectados, "
+            f"{summary['running']} rindiendo, {summary['suspicious']} sospechosos"
+        )
+        return "\n".join(lines) + "\n"
+
+    async def handle_http(self, reader, writer):
+        try:
+            request = await reader.readline()
+            #Descarta los headers
+            while (await reader.readline()).strip():
+                pass
+            parts = request.decode("latin-1").split()
+            path = parts[1] if len(parts) > 1 else "/"
+
+            status = "200 OK"
+            content_type = "application/json"
+            if path == "/":
+                body = self.format_room()
+                content_type = "text/plain; charset=utf-8"
+            elif path == "/room":
+                body = json.dumps(self.room())
+            elif path.startswith("/student/") and path[9:] in self.students:
+                body = json.dumps(self.students[path[9:]].to_dict(self.suspicious_pct))
+            else:
+                status = "404 Not Found"
+                body = json.dumps({"error": "no encontrado"})
+
+            payload = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+                + payload
+            )
+            await writer.drain()
+        except (ValueError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    #-----------Control-----------
+
+    async def start(self, host="127.0.0.1", port=8765, http_port=8766):
+        """Abre los puertos; devuelve (puerto de stats, puerto http) efectivos."""
+        stats_server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE)
+        http_server = await asyncio.start_server(self.handle_http, host, http_port, limit=MAX_LINE)
+        self._servers = [stats_server, http_server]
+        return (
+            stats_server.sockets[0].getsockname()[1],
+            http_server.sockets[0].getsockname()[1],
+        )
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+
+    async def serve_forever(self, host="127.0.0.1", port=8765, http_port=8766):
+        ports = await self.start(host, port, http_port)
+        print(f"[stats] clientes en {host}:{ports[0]}, tablero en http://{host}:{ports[1]}/")
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in self._servers))
+        finally:
+            await self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agregación en vivo de stats de un aula.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="Puerto de los clientes")
+    parser.add_argument("--http-port", type=int, default=8766, help="Puerto del tablero/consultas")
+    parser.add_argument("--max-students", type=int, default=1000)
+    parser.add_argument("--suspicious-pct", type=float, default=SUSPICIOUS_PCT)
+    args = parser.parse_args()
+
+    service = StatsService(args.max_students, args.suspicious_pct)
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port, args.http_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Línea de tiempo binaria por frame.
+
+Archivo append-only: cabecera de 16 bytes seguida de registros de ancho
+fijo (28 bytes) con timestamp, dt, parte de dt fuera de la ventana
+(out_dt), dirección, caja del rostro, flag de ventana de examen y causa.
+El escritor no guarda nada en memoria de Python más allá de un buffer
+fijo; el lector mapea el archivo a un arreglo estructurado de NumPy
+(np.memmap), así que abrir y recortar logs de horas es instantáneo.
+"""
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"MXTL"
+VERSION = 2
+HEADER = struct.Struct("<4sHHd")  #magic, versión, tamaño de registro, inicio de sesión
+RECORD = struct.Struct("<dffBhhhhBBx")
+
+RECORD_DTYPE = np.dtype([
+    ("ts", "<f8"),
+    ("dt", "<f4"),
+    ("out_dt", "<f4"),
+    ("direction", "u1"),
+    ("x", "<i2"),
+    ("y", "<i2"),
+    ("w", "<i2"),
+    ("h", "<i2"),
+    ("on_exam", "u1"),
+    ("cause", "u1"),
+    ("_pad", "V1"),
+])
+
+#Códigos de dirección y causa
+DIRECTIONS = ("center", "left", "right", "up", "down", "not_detected", "none")
+DIRECTION_CODES = {name: code for code, name in enumerate(DIRECTIONS)}
+CAUSES = (None, "mouse", "keyboard")
+CAUSE_CODES = {name: code for code, name in enumerate(CAUSES)}
+
+
+class TimelineWriter:
+    """
+    Escribe registros por frame en un archivo append-only.
+    Los registros se acumulan en un buffer fijo de `buffer_records` y se
+    vuelcan al archivo cuando se llena (o en flush/close).
+    """
+
+    def __init__(self, path, start_time=0.0, buffer_records=256):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_file:
+            #No se mezclan registros de otra versión en el mismo archivo
+            with open(path, "rb") as f:
+                magic, version, record_size, _ = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+                raise ValueError(f"Versión de log no soportada: {path}")
+        self.path = path
+        self._file = open(path, "ab")
+        if new_file:
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, start_time))
+        self._buffer = bytearray(RECORD.size * buffer_records)
+        self._capacity = buffer_records
+        self._count = 0
+        self.records_written = 0
+
+    def write(self, ts, dt, direction, box=None, on_exam=True, cause=None, out_dt=0.0):
+        """
+        Agrega un registro.
+        - direction: nombre de DIRECTIONS ("none" si no se analizó la cabeza).
+        - box: (x, y, w, h) del rostro o None.
+        - out_dt: parte de dt fuera de la ventana del examen; el resto
+          (dt - out_dt) es el tiempo de cabeza del frame.
+        """
+        x, y, w, h = box if box is not None else (0, 0, 0, 0)
+        RECORD.pack_into(
+            self._buffer, self._count * RECORD.size,
+            ts, dt, out_dt, DIRECTION_CODES[direction], x, y, w, h,
+            1 if on_exam else 0, CAUSE_CODES[cause],
+        )
+        self._count += 1
+        self.records_written += 1
+        if self._count == self._capacity:
+            self.flush()
+
+    def flush(self):
+        if self._count:
+            self._file.write(memoryview(self._buffer)[: self._count * RECORD.size])
+            self._count = 0
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+class TimelineReader:
+    """
+    Abre un log con np.memmap (sin copiar a memoria).
+    - records: arreglo estructurado con RECORD_DTYPE.
+    - start_time: inicio de la sesión según la cabecera.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, record_size, start_time = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"No es un log de línea de tiempo: {path}")
+        if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"Versión de log no soportada: {version}")
+        self.path = path
+        self.start_time = start_time
+
+        #Un registro incompleto al final (sesión cortada) se ignora
+        n = (os.path.getsize(path) - HEADER.size) // record_size
+        if n > 0:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r",
+                                     offset=HEADER.size, shape=(n,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def slice_time(self, t0, t1):
+        """Registros con t0 <= ts < t1 (vista, sin copia)."""
+        ts = self.records["ts"]
+        i0, i1 = np.searchsorted(ts, [t0, t1])
+        return self.records[i0:i1]
+
+    @staticmethod
+    def direction_names(records):
+        return np.asarray(DIRECTIONS, dtype=object)[records["direction"]]
+
+    def totals(self, records=None):
+        """
+        Segundos por dirección y fuera de la ventana, calculados sobre los
+        registros. Cada dirección suma solo la parte de dt dentro de la
+        ventana ("none": lo que quedó de un frame antes de salir).
+        """
+        records = self.records if records is None else records
+        dt = records["dt"].astype(np.float64)
+        out_dt = records["out_dt"].astype(np.float64)
+        by_direction = np.bincount(records["direction"], weights=dt - out_dt,
+                                   minlength=len(DIRECTIONS))
+        totals = {name: float(by_direction[code]) for code, name in enumerate(DIRECTIONS)}
+        totals["off_window"] = float(out_dt.sum())
+        totals["total"] = float(dt.sum())
+        return totals
+
+
+def read_timeline(path):
+    return TimelineReader(path)